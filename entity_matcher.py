@@ -0,0 +1,4240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gc
+import copy
+import io
+import os
+import re
+import sys
+import bz2
+import csv
+import json
+import math
+import zlib
+import gzip
+import unicodedata
+import time
+import queue
+import random
+import functools
+import contextlib
+import tempfile
+import atexit
+import sqlite3
+import difflib
+import argparse
+import builtins
+import tracemalloc
+import email.utils
+import threading
+import http.client
+import http.server
+import urllib.error
+import urllib.parse
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+
+# Options (they can be set from the command line, see parseArguments, or passed to Matcher and configure)
+
+# Activate import from CSV
+# if set to True: load CSV and create new JSON files
+# if set to False: load existing JSON files
+IMPORT_FROM_CSV = False
+
+# Activate person or place search
+SEARCH_WD_PEOPLE = True
+SEARCH_WD_PLACES = False
+
+# Match people without an IRI in interactive runs (by default the person search only cleans up and updates people,
+# as it always has; unattended runs and the library match them anyway)
+MATCH_PEOPLE = False
+
+# Update all with data from Wikidata
+UPDATE_ALL = False
+
+# Resume an interrupted search from its first pending person/place (False to start again from the first one)
+RESUME = True
+
+# Only report the queries planned for the search, without running them
+DRY_RUN = False
+
+# Number of VIAF IDs to resolve with each Wikidata query
+VIAF_BATCH_SIZE = 100
+
+# Number of Wikidata IDs to update with each Wikidata query
+STATEMENTS_BATCH_SIZE = 200
+
+# Base path
+BASE_PATH = os.path.dirname(os.path.realpath(__file__))
+
+# Paths to input files
+PEOPLE_IN = f'{BASE_PATH}/sloane_people.csv'
+PLACES_IN = f'{BASE_PATH}/sloane_places.csv'
+
+# Paths to output files
+PEOPLE_OUT = f'{BASE_PATH}/sloane_people.json'
+PLACES_OUT = f'{BASE_PATH}/sloane_places.json'
+
+# Build the local Wikidata index from a JSON dump (.json.gz or .json.bz2) and exit
+BUILD_LOCAL_INDEX = False
+WIKIDATA_DUMP = f'{BASE_PATH}/latest-all.json.gz'
+
+# Run all queries against the local Wikidata index instead of the Wikidata endpoint
+USE_LOCAL_INDEX = False
+LOCAL_INDEX_PATH = f'{BASE_PATH}/wikidata_local.sqlite'
+
+# Search names in the local fuzzy name index instead of the Wikidata entity search
+USE_NAME_INDEX = False
+
+# Number of candidates returned by the name index
+NAME_INDEX_TOP = 10
+
+# Compare the name index with the Wikidata entity search on the input names and exit
+BENCHMARK_NAME_INDEX = False
+BENCHMARK_SAMPLE = 200
+
+# Compare the memory used by entity records and by dicts for synthetic people and exit
+BENCHMARK_RECORDS = False
+BENCHMARK_RECORD_ROWS = 1000000
+
+# Match names without asking: accept the best candidate if its score is above the threshold
+# and ahead of the second best by the margin, and queue the other cases for review
+AUTO_MATCH = False
+AUTO_MATCH_THRESHOLD = 0.85
+AUTO_MATCH_MARGIN = 0.05
+
+# Rank the Wikidata candidates of places with coordinates by their distance to the place (fetched with the search
+# results), lowering the score of candidates farther than GEO_RADIUS km
+GEO_RANKING = True
+GEO_RADIUS = 100
+
+# Match places within GEO_DUPLICATE_DISTANCE km of an earlier place with a similar name (at least
+# GEO_DUPLICATE_SIMILARITY) with the earlier place instead of searching them (0 to search all places)
+GEO_DUPLICATE_DISTANCE = 5
+GEO_DUPLICATE_SIMILARITY = 0.9
+
+# Cluster probable duplicate people and places before the search (same VIAF ID, or names whose phonetic keys have
+# tokens at least CLUSTER_SIMILARITY similar, compared only within blocks of at most CLUSTER_MAX_BLOCK entities sharing
+# a VIAF ID or the phonetic code of a name token) and give the match of the first one of each cluster to the others
+# without asking (people born in different years and places more than GEO_RADIUS km apart are never clustered)
+CLUSTER_DUPLICATES = False
+CLUSTER_SIMILARITY = 0.95
+CLUSTER_MAX_BLOCK = 100
+
+# Review the cases queued by an unattended run, queued in REVIEW_OUT (None to queue none, as the Matcher does)
+REVIEW_MATCHES = False
+REVIEW_OUT = f'{BASE_PATH}/sloane_review.jsonl'
+
+# Number of updates appended to the journals (or upserted in one transaction to the SQLite stores) before syncing them
+JOURNAL_SYNC_EVERY = 100
+
+# Keep people and places in SQLite stores next to the JSON files (e.g. sloane_people.sqlite), indexed by Wikidata ID,
+# VIAF ID, normalized name and alias, instead of JSON files and journals
+OUTPUT_SQLITE = False
+
+# Write the JSON files from the SQLite stores and exit
+EXPORT_JSON = False
+
+# Wikidata query URL
+WD_URL = 'https://query.wikidata.org/sparql?query='
+
+# Engine of the Wikidata lookups: 'sparql' (the query service) or 'action' (the MediaWiki Action API, which is
+# throttled less: wbsearchentities, wbgetentities and haswbstatement searches); the local index replaces both
+LOOKUP_ENGINE = 'sparql'
+
+# Wikidata Action API URL, and number of IDs fetched with each wbgetentities request (50 at most)
+ACTION_API_URL = 'https://www.wikidata.org/w/api.php'
+ACTION_BATCH_SIZE = 50
+
+# Maximum number of idle connections kept open for each host
+POOL_SIZE = 8
+
+# Number of worker threads fetching Wikidata candidates in parallel (0 to fetch sequentially)
+SEARCH_WORKERS = 4
+
+# Number of unresolved people/places whose candidates are fetched ahead of the one being reviewed
+PREFETCH_AHEAD = 10
+
+# Number of names searched with each Wikidata query when fetching candidates ahead (1 to search each name on its own)
+SEARCH_BATCH_SIZE = 10
+
+# Maximum number of requests per second and of simultaneous requests to Wikidata
+MAX_REQUESTS_PER_SECOND = 5
+MAX_IN_FLIGHT = 4
+
+# Retries of a failed request, with jittered exponential backoff between base and maximum seconds
+# (Wikidata's Retry-After is used instead when it sends one)
+MAX_RETRIES = 5
+BACKOFF_BASE = 1
+BACKOFF_MAX = 60
+
+# Response time in seconds above which the request rate is lowered (it is raised again while faster)
+TARGET_LATENCY = 10
+
+# Benchmark the unattended person and place search against a local stub SPARQL endpoint,
+# which replays the responses recorded in the cache and generates the missing ones (and answers Action API requests)
+BENCHMARK = False
+
+# Compare the lookup engines by running the benchmark with each of them in a worker process
+BENCHMARK_ENGINES = False
+
+# Latency in seconds and share of failed requests (429 or 503) injected by the stub endpoint
+STUB_LATENCY = 0.05
+STUB_ERROR_RATE = 0
+
+# Maximum number of requests per second (0 for no limit) and of simultaneous requests to the stub endpoint
+# in the benchmark, high so that it measures the matcher rather than the rate limiter (--rate sets the first)
+BENCHMARK_RATE = 0
+BENCHMARK_IN_FLIGHT = 32
+
+# Number of people and of places to generate from the input CSVs for the benchmark (None to use them as they are)
+BENCHMARK_ROWS = None
+
+# Path of a JSON file to write the run metrics to (None to only print them)
+METRICS_OUT = None
+
+# Number of worker processes searching a hash partition of the people and places each, unattended and with
+# an equal share of the request rate (1 to search in this process), and directory of their inputs, outputs and logs
+SHARDS = 1
+SHARDS_PATH = f'{BASE_PATH}/shards'
+
+# Serve lookups over HTTP (POST a JSON person/place, or a list of them, to /people or /places) instead of running
+SERVE = False
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8000
+
+# Maximum number of query results kept in memory by the workers (the oldest are dropped first)
+MAX_MEMOIZED_QUERIES = 100000
+
+# Cache Wikidata responses on disk
+CACHE_ENABLED = True
+CACHE_PATH = f'{BASE_PATH}/sloane_cache.sqlite'
+
+# Days before cached responses expire, for each query type
+CACHE_TTL = {
+    'search': 30,
+    'viaf': 30,
+    'statements': 7,
+    'country': 30,
+    'items': 30,
+}
+
+# Maximum size of the cache in MB (least recently used responses are evicted first)
+CACHE_MAX_SIZE = 500
+
+# Only replay cached responses and never query Wikidata
+CACHE_OFFLINE = False
+
+# Banned IRIs
+BANNED = [
+    'http://www.wikidata.org/entity/Q1195653',
+    'http://www.wikidata.org/entity/Q2447888',
+    'http://www.wikidata.org/entity/Q2691454',
+    'http://www.wikidata.org/entity/Q3301358',
+    'http://www.wikidata.org/entity/Q3487832',
+    'http://www.wikidata.org/entity/Q5457358',
+    'http://www.wikidata.org/entity/Q5518251',
+    'http://www.wikidata.org/entity/Q5645737',
+    'http://www.wikidata.org/entity/Q7506702',
+    'http://www.wikidata.org/entity/Q7721368',
+    'http://www.wikidata.org/entity/Q10314624',
+    'http://www.wikidata.org/entity/Q16993690',
+    'http://www.wikidata.org/entity/Q20523028',
+    'http://www.wikidata.org/entity/Q24065083',
+    'http://www.wikidata.org/entity/Q60838490',
+]
+
+# Rules of the normalization stage, applied in order to all people and places before the search: fields (add the
+# missing fields), aliases (sort aliases and remove duplicates), gender (clear the gender of people without IRI and
+# use woman/man), honorifics (guess the gender of people from honorifics in their names), birth (unmatch people born
+# after LATEST_BIRTH), viaf (use null for missing VIAF IDs) and banned (unmatch banned IRIs)
+PEOPLE_NORMALIZATION = ['fields', 'aliases', 'gender', 'honorifics', 'birth', 'viaf']
+PLACES_NORMALIZATION = ['aliases', 'viaf', 'banned']
+
+# Honorifics showing the gender of people, anywhere in their names (male ones win if a name has both)
+MALE_HONORIFICS = ['Mr ', 'Mr.', 'Lord ', 'Earl ', 'Sir ', 'Baron ', 'Ld ', 'Ld. ', 'Count ']
+FEMALE_HONORIFICS = ['Mrs ', 'Mrs. ', 'Lady ', 'Miss ', 'Baroness ', 'Countess ', 'Daughter ', 'Niece ', 'Neice ']
+
+# People born after this year are never matched
+LATEST_BIRTH = 1743
+
+# Print nothing (the Matcher sets it unless QUIET=False is given)
+QUIET = False
+
+# Function to print unless QUIET (used instead of the builtin print in this module)
+def print(*args, **kwargs):
+    if not QUIET:
+        builtins.print(*args, **kwargs)
+
+# Function to check whether the output is a terminal (it may have no file descriptor, e.g. in a notebook)
+def isTerminal():
+    try:
+        return os.isatty(sys.stdout.fileno())
+    except (AttributeError, OSError, ValueError):
+        return False
+
+# Function to make text red
+def red(string):
+    return '\x1b[91m{}\x1b[0m'.format(string) if isTerminal() else string
+
+# Function to make text yellow
+def yellow(string):
+    return '\x1b[93m{}\x1b[0m'.format(string) if isTerminal() else string
+
+# Function to make text green
+def green(string):
+    return '\x1b[92m{}\x1b[0m'.format(string) if isTerminal() else string
+
+# Function to make text pink
+def pink(string):
+    return '\x1b[95m{}\x1b[0m'.format(string) if isTerminal() else string
+
+# Function to make text blue
+def blue(string):
+    return '\x1b[96m{}\x1b[0m'.format(string) if isTerminal() else string
+
+# Run counters and latency histograms (with buckets growing by 25% from 10 microseconds)
+class Metrics:
+    buckets = [0.00001 * 1.25 ** i for i in range(84)]
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.counters = {}
+        self.histograms = {}
+
+    # Function to increase a counter
+    def add(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    # Function to add a duration in seconds to a histogram
+    def observe(self, name, seconds):
+        with self.lock:
+            histogram = self.histograms.setdefault(name, {'count': 0, 'total': 0, 'max': 0, 'buckets': {}})
+            histogram['count'] += 1
+            histogram['total'] += seconds
+            histogram['max'] = max(histogram['max'], seconds)
+            bucket = next((i for i, x in enumerate(self.buckets) if seconds <= x), len(self.buckets))
+            histogram['buckets'][bucket] = histogram['buckets'].get(bucket, 0) + 1
+
+    # Function to add the counters and histograms of another run (e.g. of a worker process)
+    def merge(self, counters, histograms):
+        with self.lock:
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for name, other in histograms.items():
+                histogram = self.histograms.setdefault(name, {'count': 0, 'total': 0, 'max': 0, 'buckets': {}})
+                histogram['count'] += other['count']
+                histogram['total'] += other['total']
+                histogram['max'] = max(histogram['max'], other['max'])
+                for bucket, count in other['buckets'].items():
+                    histogram['buckets'][bucket] = histogram['buckets'].get(bucket, 0) + count
+
+    # Function to time a block of code
+    @contextlib.contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    # Function to time every call of a function
+    def timed(self, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.timer(function.__name__):
+                return function(*args, **kwargs)
+        return wrapper
+
+    # Function to estimate a percentile of a histogram (the upper bound of its bucket)
+    def percentile(self, name, fraction):
+        histogram = self.histograms.get(name)
+        if not histogram:
+            return 0
+        seen = 0
+        for bucket in sorted(histogram['buckets']):
+            seen += histogram['buckets'][bucket]
+            if seen >= fraction * histogram['count']:
+                return min(self.buckets[bucket], histogram['max']) if bucket < len(self.buckets) else histogram['max']
+        return histogram['max']
+
+    # Function to print a table of the time spent in each phase
+    def report(self):
+        wallTime = time.perf_counter() - self.start
+        print(f'   {"Phase":<22}{"Calls":>9}{"Total s":>11}{"Mean ms":>11}{"p50 ms":>11}{"p95 ms":>11}{"Max ms":>11}')
+        for name, histogram in sorted(self.histograms.items(), key=lambda x: -x[1]['total']):
+            print(f'   {name:<22}{histogram["count"]:>9}{histogram["total"]:>11.2f}'
+                  f'{1000*histogram["total"]/histogram["count"]:>11.2f}{1000*self.percentile(name, 0.5):>11.2f}'
+                  f'{1000*self.percentile(name, 0.95):>11.2f}{1000*histogram["max"]:>11.2f}')
+        for name in sorted(x for x in self.counters if x.startswith('bytes.')):
+            print(f'   {name:<22}{self.counters[name]/1024/1024:>9.2f} MB decoded')
+        print(f'   Wall-clock time: {wallTime:.2f} s (phases overlap when they run in worker threads)\n')
+
+    # Function to get all metrics as a dict
+    def summary(self):
+        with self.lock:
+            return {
+                'wallTime': time.perf_counter() - self.start,
+                'counters': dict(self.counters),
+                'phases': {name: {'count': x['count'], 'total': x['total'], 'max': x['max'],
+                                  'p50': self.percentile(name, 0.5), 'p95': self.percentile(name, 0.95),
+                                  'buckets': {str(self.buckets[i]) if i < len(self.buckets) else 'inf': n
+                                              for i, n in sorted(x['buckets'].items())}}
+                           for name, x in self.histograms.items()},
+            }
+
+    # Function to write all metrics to a JSON file
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+metrics = Metrics()
+
+# Persistent cache of Wikidata responses, with its total size kept in the database so that the processes
+# sharing it (e.g. shards) evict by the same count
+class ResponseCache:
+    def __init__(self, path, maxSize):
+        self.lock = threading.Lock()
+        self.maxSize = maxSize * 1024 * 1024
+        self.db = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS responses (query TEXT PRIMARY KEY, type TEXT, '
+                        'created REAL, accessed REAL, size INTEGER, body BLOB)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS total (id INTEGER PRIMARY KEY, size INTEGER)')
+        self.db.execute('INSERT OR IGNORE INTO total VALUES (0, (SELECT COALESCE(SUM(size), 0) FROM responses))')
+        self.db.commit()
+
+    # Function to get a cached response (expired responses are still replayed offline)
+    def get(self, query, queryType):
+        with self.lock:
+            row = self.db.execute('SELECT created, body FROM responses WHERE query = ?', (query,)).fetchone()
+            if not row:
+                return None
+            if not CACHE_OFFLINE and time.time() - row[0] > CACHE_TTL.get(queryType, 0) * 86400:
+                return None
+            self.db.execute('UPDATE responses SET accessed = ? WHERE query = ?', (time.time(), query))
+            self.db.commit()
+            return zlib.decompress(row[1]).decode('utf-8')
+
+    # Function to cache a response and evict the least recently used ones if needed
+    def put(self, query, queryType, response):
+        body = zlib.compress(response.encode('utf-8'))
+        now = time.time()
+        with self.lock:
+            # Write with the database locked, so that the total size counts the responses of all processes
+            self.db.execute('BEGIN IMMEDIATE')
+            old = self.db.execute('SELECT size FROM responses WHERE query = ?', (query,)).fetchone()
+            self.db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                            (query, queryType, now, now, len(body), body))
+            size = self.db.execute('SELECT size FROM total').fetchone()[0] + len(body) - (old[0] if old else 0)
+
+            # Evict down to 90% of the maximum size
+            if size > self.maxSize:
+                for oldQuery, oldSize in self.db.execute('SELECT query, size FROM responses ORDER BY accessed').fetchall():
+                    if size <= 0.9 * self.maxSize:
+                        break
+                    self.db.execute('DELETE FROM responses WHERE query = ?', (oldQuery,))
+                    size -= oldSize
+                    metrics.add('cacheEvictions')
+            self.db.execute('UPDATE total SET size = ?', (size,))
+            self.db.commit()
+
+    # Function to close the cache database
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+# Cache, connection pool, rate limiter, workers, local index and journals shared by all matches (created by configure)
+responseCache = connectionPool = rateLimiter = candidateFetcher = localIndex = lookupEngine = peopleJournal = placesJournal = None
+peopleProgress = placesProgress = None
+
+# Pool of persistent HTTP connections shared by all threads
+class ConnectionPool:
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.idle = {}
+
+    # Function to get an idle connection to a host, or open a new one
+    def get(self, scheme, host):
+        with self.lock:
+            connections = self.idle.get((scheme, host))
+            if connections:
+                metrics.add('connectionsReused')
+                return connections.pop(), True
+        metrics.add('connectionsOpened')
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, timeout=120), False
+        return http.client.HTTPConnection(host, timeout=120), False
+
+    # Function to close the idle connections to a host (e.g. after the server closed one of them)
+    def discard(self, scheme, host):
+        with self.lock:
+            connections = self.idle.pop((scheme, host), [])
+        for connection in connections:
+            connection.close()
+
+    # Function to return a connection to the pool once its response has been read
+    def put(self, scheme, host, connection):
+        with self.lock:
+            connections = self.idle.setdefault((scheme, host), [])
+            if len(connections) < self.size:
+                connections.append(connection)
+                return
+        connection.close()
+
+# Rate limiter shared by all threads making requests, adapting the rate to throttling and latency
+class RateLimiter:
+    def __init__(self, rate, maxInFlight):
+        self.rate = rate
+        self.maxRate = rate
+        self.lock = threading.Lock()
+        self.next = time.monotonic()
+        self.lastDecrease = 0
+        self.inFlight = threading.BoundedSemaphore(maxInFlight)
+
+    # Wait for a free slot and for the next request time
+    def __enter__(self):
+        self.inFlight.acquire()
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next - now
+            self.next = max(self.next, now) + (1 / self.rate if self.rate else 0)
+        if wait > 0:
+            time.sleep(wait)
+        return self
+
+    def __exit__(self, *args):
+        self.inFlight.release()
+
+    # Function to halve the request rate (at most once per TARGET_LATENCY seconds) and pause all requests
+    def decrease(self, pause=0):
+        with self.lock:
+            now = time.monotonic()
+            self.next = max(self.next, now + pause)
+            if self.maxRate and now - self.lastDecrease > TARGET_LATENCY:
+                self.rate = max(self.maxRate / 50, self.rate / 2)
+                self.lastDecrease = now
+                metrics.add('rateDecreases')
+
+    # Function to raise the request rate a little after a fast response, or lower it after a slow one
+    def observe(self, latency):
+        if latency > TARGET_LATENCY:
+            self.decrease()
+        elif self.maxRate:
+            with self.lock:
+                self.rate = min(self.maxRate, self.rate + 0.1)
+
+# Function to make one request and return the (decompressed) content of the page
+def openURL(url):
+    # Set headers
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows)',
+        'Accept-Encoding': 'gzip',
+        'Connection': 'keep-alive',
+    }
+
+    # Follow up to five redirects
+    for redirect in range(6):
+        parts = urllib.parse.urlsplit(url)
+        path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+
+        # Try to open the URL (once more if the server closed an idle connection, on a new one as the other
+        # idle connections to the host were probably closed too)
+        for attempt in range(2):
+            connection, reused = connectionPool.get(parts.scheme, parts.netloc)
+            try:
+                with rateLimiter:
+                    start = time.monotonic()
+                    connection.request('GET', path, headers=headers)
+                    response = connection.getresponse()
+                    content = response.read()
+                    latency = time.monotonic() - start
+            except (http.client.HTTPException, OSError) as e:
+                connection.close()
+                if reused and isinstance(e, (http.client.RemoteDisconnected, ConnectionError)):
+                    connectionPool.discard(parts.scheme, parts.netloc)
+                    error = e
+                    continue
+                raise urllib.error.URLError(e)
+            break
+        else:
+            raise urllib.error.URLError(error)
+
+        # Count requests, bytes and latencies
+        metrics.add('requests')
+        metrics.add('bytes', len(content))
+        metrics.observe('request', latency)
+
+        if response.will_close:
+            connection.close()
+        else:
+            connectionPool.put(parts.scheme, parts.netloc, connection)
+
+        # Adjust the request rate on successful responses only (throttled ones lower it in loadURL)
+        if response.status < 400:
+            rateLimiter.observe(latency)
+
+        if response.status in (301, 302, 303, 307, 308) and response.getheader('Location') and redirect < 5:
+            url = urllib.parse.urljoin(url, response.getheader('Location'))
+            continue
+        if response.status >= 400:
+            raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(content))
+
+        # Handle gzipped pages
+        if response.getheader('Content-Encoding') == 'gzip':
+            content = gzip.decompress(content)
+        return content
+    return None
+
+# Function to get the seconds to wait from a Retry-After header (in seconds or as a date)
+def retryAfter(value):
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return int(value)
+    try:
+        return max(0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+# Function to load a URL and return the content of the page (retrying failed requests MAX_RETRIES times, unless given)
+def loadURL(url, encoding='utf-8', asLines=False, retries=None):
+    retries = MAX_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            content = openURL(url)
+        except urllib.error.HTTPError as e:
+            if e.code not in (429, 500, 502, 503, 504) or attempt == retries:
+                raise
+            delay = retryAfter(e.headers.get('Retry-After')) if e.headers else None
+
+            # Slow down all requests when Wikidata throttles
+            if e.code == 429:
+                metrics.add('throttled')
+                rateLimiter.decrease(delay or 0)
+            else:
+                metrics.add('serverErrors')
+        except urllib.error.URLError:
+            if attempt == retries:
+                raise
+            metrics.add('networkErrors')
+            delay = None
+        else:
+            # Return the content of the page
+            return content.splitlines(keepends=True) if asLines else content.decode(encoding)
+
+        # Wait before retrying
+        if delay is None:
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        metrics.add('retries')
+        time.sleep(delay)
+    return None
+
+# Pool of daemon worker threads fetching Wikidata candidates in the background, running each query once
+# (threads needing a query that is running wait for its results instead of running it again)
+class CandidateFetcher:
+    def __init__(self, workers, maxSize):
+        self.workers = workers
+        self.maxSize = maxSize
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.futures = {}
+        for i in range(workers):
+            threading.Thread(target=self.work, daemon=True).start()
+
+    # Function run by each worker thread, until it gets None
+    def work(self):
+        while True:
+            task = self.queue.get()
+            if task is None:
+                return
+            task[0](*task[1:])
+
+    # Function to run a query and set the results of its future (failed queries are forgotten, to be run again)
+    def run(self, key, future, function, args):
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(function(*args))
+            except BaseException as e:
+                with self.lock:
+                    if self.futures.get(key) is future:
+                        del self.futures[key]
+                future.set_exception(e)
+
+    # Function to get the future of a query, and whether it is new (dropping the oldest results if there are too many)
+    def future(self, key):
+        with self.lock:
+            if key in self.futures:
+                return self.futures[key], False
+            if len(self.futures) >= self.maxSize:
+                for oldKey in [x for x, y in self.futures.items() if y.done()][:len(self.futures) - self.maxSize + 1]:
+                    del self.futures[oldKey]
+            future = self.futures[key] = Future()
+            return future, True
+
+    # Function to queue a query, unless it has already been queued
+    def submit(self, function, *args):
+        if not self.workers:
+            return
+        key = (function.__name__,) + args
+        future, new = self.future(key)
+        if new:
+            self.queue.put((self.run, key, future, function, args))
+
+    # Function to run the queries of many values with a batch function, which returns the results of each value
+    def runBatch(self, pending, batchFunction, args):
+        pending = [(value, key, future) for value, key, future in pending if future.set_running_or_notify_cancel()]
+        try:
+            results = batchFunction([value for value, key, future in pending], *args)
+        except BaseException as e:
+            for value, key, future in pending:
+                with self.lock:
+                    if self.futures.get(key) is future:
+                        del self.futures[key]
+                future.set_exception(e)
+            return
+        for value, key, future in pending:
+            future.set_result(results[value])
+
+    # Function to queue the queries of many values, unless they have already been queued, running them together
+    # with a batch function in batches of the given size
+    def submitBatch(self, function, batchFunction, values, *args, size):
+        if not self.workers:
+            return
+        pending = []
+        for value in values:
+            key = (function.__name__, value) + args
+            future, new = self.future(key)
+            if new:
+                pending.append((value, key, future))
+
+        # Queue single values as single queries
+        for i in range(0, len(pending), size):
+            if len(pending[i:i + size]) == 1:
+                value, key, future = pending[i]
+                self.queue.put((self.run, key, future, function, (value,) + args))
+            else:
+                self.queue.put((self.runBatch, pending[i:i + size], batchFunction, args))
+
+    # Function to get the results of a query, waiting for them if it was queued or is running
+    def get(self, function, *args):
+        key = (function.__name__,) + args
+        future, new = self.future(key)
+
+        # Run the query here and keep its results for the next entities that need them
+        if new:
+            self.run(key, future, function, args)
+        elif not future.done():
+            metrics.add('coalescedQueries')
+        return future.result()
+
+    # Function to stop the worker threads once the queued queries have run
+    def close(self):
+        for i in range(self.workers):
+            self.queue.put(None)
+
+# Languages of labels, descriptions and aliases, in the order used by the Wikidata label service
+LABEL_LANGUAGES = ['en', 'la', 'it', 'fr', 'es', 'de']
+
+# Function to get the best-ranked values of a property from an entity of the Wikidata dump
+def claimValues(entity, prop):
+    statements = [x for x in entity.get('claims', {}).get(prop, [])
+                  if x.get('rank') != 'deprecated' and x['mainsnak'].get('snaktype') == 'value']
+    preferred = [x for x in statements if x.get('rank') == 'preferred']
+    return [x['mainsnak']['datavalue']['value'] for x in (preferred or statements)]
+
+# Function to get the first text of an entity of the Wikidata dump in the label languages
+def dumpText(texts):
+    for language in LABEL_LANGUAGES:
+        if language in texts:
+            return texts[language]['value']
+    return None
+
+# Function to convert a Wikidata dump time to the format returned by SPARQL
+def dumpTime(value):
+    match = re.match(r'([+-])(\d+)-(\d\d)-(\d\d)(T.*)', value['time'])
+    if not match:
+        return None
+    sign, year, month, day, rest = match.groups()
+    return f'{"-" if sign == "-" else ""}{int(year):04d}-{month if month != "00" else "01"}-{day if day != "00" else "01"}{rest}'
+
+# Function to get the numeric IDs of the item values of a property
+def claimIds(entity, prop):
+    return [x['numeric-id'] for x in claimValues(entity, prop) if isinstance(x, dict) and 'numeric-id' in x]
+
+# Function to read a Wikidata JSON dump one entity at a time
+def readDump(path, prefilter=None):
+    opener = bz2.open if path.endswith('.bz2') else gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for i, line in enumerate(f):
+            line = line.strip().rstrip(',')
+            if i and i % 1000000 == 0:
+                print(f'   {i} lines read')
+            if len(line) < 2 or (prefilter and not prefilter(line)):
+                continue
+            yield json.loads(line)
+
+# Function to build the local Wikidata index of humans and places from a JSON dump
+def buildLocalIndex(dumpPath, indexPath):
+    if os.path.exists(indexPath):
+        os.remove(indexPath)
+    db = sqlite3.connect(indexPath)
+    db.execute('CREATE TABLE entities (qid INTEGER PRIMARY KEY, type TEXT, label TEXT, description TEXT, '
+               'birth TEXT, death TEXT, gender INTEGER, image TEXT, geo TEXT, class INTEGER, '
+               'birthplaces TEXT, countries TEXT, continents TEXT)')
+    db.execute('CREATE TABLE names (name TEXT, qid INTEGER)')
+    db.execute('CREATE TABLE viafs (viaf TEXT, qid INTEGER)')
+    db.execute('CREATE TABLE redirects (qid INTEGER PRIMARY KEY, target INTEGER)')
+
+    # Function to get the columns of the entities table for a dump entity
+    def entityRow(entity, type):
+        images = claimValues(entity, 'P18')
+        births = [dumpTime(x) for x in claimValues(entity, 'P569')]
+        deaths = [dumpTime(x) for x in claimValues(entity, 'P570')]
+        coordinates = [x for x in claimValues(entity, 'P625') if x.get('globe', '').endswith('/Q2')]
+        return (int(entity['id'][1:]), type, dumpText(entity.get('labels', {})),
+                dumpText(entity.get('descriptions', {})),
+                births[0] if births else None, deaths[0] if deaths else None,
+                (claimIds(entity, 'P21') or [None])[0],
+                f'http://commons.wikimedia.org/wiki/Special:FilePath/{urllib.parse.quote(images[0])}' if images else None,
+                f'Point({coordinates[0]["longitude"]} {coordinates[0]["latitude"]})' if coordinates else None,
+                (claimIds(entity, 'P31') or [None])[0],
+                ','.join(str(x) for x in claimIds(entity, 'P19')),
+                ','.join(str(x) for x in claimIds(entity, 'P17')),
+                ','.join(str(x) for x in claimIds(entity, 'P30')))
+
+    # First pass: keep humans (instances of Q5), places (anything with coordinates) and redirects (entities
+    # shaped as the entity data API returns them for a redirected ID)
+    referenced = set()
+    rows, names, viafs, redirects = [], [], [], []
+    print(pink('   === Build Local Index ===\n'))
+    for entity in readDump(dumpPath, lambda line: '"P625"' in line or '"numeric-id":5,' in line or '"redirects"' in line):
+        if entity.get('type') != 'item':
+            continue
+        if 'redirects' in entity:
+            redirects.append((int(entity['redirects']['from'][1:]), int(entity['redirects']['to'][1:])))
+            continue
+        classes = claimIds(entity, 'P31')
+        type = 'human' if 5 in classes else 'place' if claimValues(entity, 'P625') else None
+        if not type:
+            continue
+
+        row = entityRow(entity, type)
+        rows.append(row)
+        for language in LABEL_LANGUAGES:
+            for text in [entity.get('labels', {}).get(language)] + entity.get('aliases', {}).get(language, []):
+                if text:
+                    names.append((text['value'].casefold(), row[0]))
+        viafs += [(viaf, row[0]) for viaf in claimValues(entity, 'P214')]
+        referenced.update(x for x in (row[6], row[9]) if x)
+        referenced.update(claimIds(entity, 'P19'))
+
+        if len(rows) >= 10000:
+            db.executemany('INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            db.executemany('INSERT INTO names VALUES (?, ?)', set(names))
+            db.executemany('INSERT INTO viafs VALUES (?, ?)', viafs)
+            rows, names, viafs = [], [], []
+    db.executemany('INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    db.executemany('INSERT INTO names VALUES (?, ?)', set(names))
+    db.executemany('INSERT INTO viafs VALUES (?, ?)', viafs)
+    db.executemany('INSERT OR REPLACE INTO redirects VALUES (?, ?)', redirects)
+
+    # Function to check whether a line of the dump holds a referenced entity
+    idPattern = re.compile(r'"id":"Q(\d+)"')
+    def isReferenced(line):
+        match = idPattern.search(line[:200])
+        return bool(match) and int(match[1]) in referenced
+
+    # Second pass: add labels (and countries) of referenced genders, classes and birthplaces
+    rows = []
+    for entity in readDump(dumpPath, isReferenced):
+        rows.append(entityRow(entity, None))
+        if len(rows) >= 10000:
+            db.executemany('INSERT OR IGNORE INTO entities VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            rows = []
+    db.executemany('INSERT OR IGNORE INTO entities VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    db.execute('CREATE INDEX names_name ON names (name)')
+    db.execute('CREATE INDEX viafs_viaf ON viafs (viaf)')
+    db.commit()
+
+    count = db.execute('SELECT type, COUNT(*) FROM entities GROUP BY type').fetchall()
+    print(f'   Indexed entities:   {dict(count)}\n')
+    db.close()
+
+# Local Wikidata index answering queries with results shaped like SPARQL results
+# (a lookup engine: search, searchBatch, viaf, viafBatch, bindings, statements, statementsBatch, birthCountry
+# and birthCountryBatch answer the queries of wdQuery, wdSearchBatchQuery, wdViafQuery, wdViafBatchQuery,
+# wdItemsQuery, getStatements, getStatementsBatch, getBirthCountry and getBirthCountryBatch)
+class LocalIndex:
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False)
+        self.redirects = bool(self.db.execute("SELECT name FROM sqlite_master WHERE name = 'redirects'").fetchone())
+
+    # Function to get the ID an entity was redirected to (indexes built before redirects were kept have none)
+    def target(self, qid):
+        row = self.db.execute('SELECT target FROM redirects WHERE qid = ?', (qid,)).fetchone() if self.redirects else None
+        return row[0] if row else qid
+
+    # Function to get the label of an entity (the ID if it has no label, as the label service does)
+    def label(self, qid):
+        row = self.db.execute('SELECT label FROM entities WHERE qid = ?', (qid,)).fetchone()
+        return row[0] if row and row[0] else f'Q{qid}'
+
+    # Function to get entities as SPARQL bindings
+    def bindings(self, qids, type=None):
+        results = []
+        for qid in map(self.target, qids):
+            row = self.db.execute('SELECT type, label, description, image, birth, death, gender, geo '
+                                  'FROM entities WHERE qid = ?', (qid,)).fetchone()
+            if not row or (type and row[0] != type):
+                continue
+            entity = {'item': {'value': f'http://www.wikidata.org/entity/Q{qid}'},
+                      'itemLabel': {'value': row[1] or f'Q{qid}'}}
+            for name, value in zip(('itemDescription', 'image', 'birth', 'death'), row[2:6]):
+                if value:
+                    entity[name] = {'value': value}
+            if row[6]:
+                entity['genderLabel'] = {'value': self.label(row[6])}
+            if row[7] and row[0] == 'place':
+                entity['geo'] = {'value': row[7]}
+            results.append(entity)
+        return results
+
+    # Function to search humans or places by label or alias (exact matches before prefix matches)
+    def search(self, name, type):
+        name = name.casefold()
+        with self.lock:
+            rows = self.db.execute('SELECT DISTINCT qid FROM names WHERE name = ? '
+                                   'UNION ALL SELECT DISTINCT qid FROM names WHERE name > ? AND name < ? LIMIT 100',
+                                   (name, name, f'{name}\uffff')).fetchall()
+            qids = list(dict.fromkeys(x[0] for x in rows))
+            return self.bindings(qids, 'human' if type == 'Q5' else 'place')[:50]
+
+    # Function to search many names
+    def searchBatch(self, names, type):
+        return {name: self.search(name, type) for name in names}
+
+    # Function to find entities by VIAF ID
+    def viaf(self, viaf):
+        with self.lock:
+            rows = self.db.execute('SELECT DISTINCT qid FROM viafs WHERE viaf = ?', (viaf,)).fetchall()
+            return self.bindings([x[0] for x in rows])
+
+    # Function to find entities by many VIAF IDs
+    def viafBatch(self, viafs):
+        return {viaf: self.viaf(viaf) for viaf in viafs}
+
+    # Function to get the statements of an entity, as getStatements returns them
+    def statements(self, qid):
+        with self.lock:
+            row = self.db.execute('SELECT label, description, image, birth, death, gender, class, geo '
+                                  'FROM entities WHERE qid = ?', (self.target(int(qid[1:])),)).fetchone()
+            if not row or not row[6]:
+                return (None, None, None, None, None, None, None, None)
+            return (row[0] or qid, row[1], row[2], row[3], row[4],
+                    self.label(row[5]) if row[5] else None, self.label(row[6]), row[7])
+
+    # Function to get the statements of many entities
+    def statementsBatch(self, qids):
+        return {qid: self.statements(qid) for qid in qids}
+
+    # Function to get the birth country of a person outside Europe, as getBirthCountry returns it
+    def birthCountry(self, qid):
+        with self.lock:
+            row = self.db.execute('SELECT birthplaces FROM entities WHERE qid = ?', (self.target(int(qid[1:])),)).fetchone()
+            for birthplace in (row[0].split(',') if row and row[0] else []):
+                place = self.db.execute('SELECT countries FROM entities WHERE qid = ?', (int(birthplace),)).fetchone()
+                for country in (place[0].split(',') if place and place[0] else []):
+                    continents = self.db.execute('SELECT continents FROM entities WHERE qid = ?', (int(country),)).fetchone()
+                    if continents and continents[0] and '46' not in continents[0].split(','):
+                        return self.label(int(country))
+            return False
+
+    # Function to get the birth countries of many people
+    def birthCountryBatch(self, qids):
+        return {qid: self.birthCountry(qid) for qid in qids}
+
+    # Function to close the index database
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+# Lookup engine answering queries with the Wikidata Action API instead of SPARQL, with results shaped like SPARQL
+# results (humans are instances of Q5 and places anything with coordinates, as in the local index)
+class ActionEngine:
+    # Number of VIAF IDs found with each haswbstatement search (searches are limited to 300 characters)
+    viafBatchSize = 10
+
+    # Prefix of the cache keys of Action API responses, which are kept next to the SPARQL responses
+    cachePrefix = 'action:'
+
+    def __init__(self, url):
+        self.url = url
+        self.lock = threading.Lock()
+        self.labels = {}
+
+    # Function to run an Action API request, using cached responses when available
+    def query(self, queryType, **params):
+        key = urllib.parse.urlencode(dict(params, format='json'))
+        if responseCache:
+            results = responseCache.get(self.cachePrefix + key, queryType)
+            if results is not None:
+                metrics.add('cacheHits')
+                return json.loads(results)
+            metrics.add('cacheMisses')
+
+        if CACHE_OFFLINE:
+            return {}
+
+        # Load request URL
+        results = loadURL(f'{self.url}?{key}')
+        if not results:
+            return {}
+        metrics.add(f'bytes.{queryType}', len(results.encode('utf-8')))
+        response = json.loads(results)
+        if 'error' in response:
+            print(red(f'   Action API error: {response["error"].get("info")}'))
+            return {}
+
+        if responseCache:
+            responseCache.put(self.cachePrefix + key, queryType, results)
+        return response
+
+    # Function to get entities by ID (keyed by the requested IDs, which may be redirects)
+    def entities(self, qids, queryType, props='labels|descriptions|claims'):
+        qids = list(dict.fromkeys(qids))
+        entities = {}
+        for i in range(0, len(qids), ACTION_BATCH_SIZE):
+            results = self.query(queryType, action='wbgetentities', ids='|'.join(qids[i:i + ACTION_BATCH_SIZE]),
+                                 props=props, languages='|'.join(LABEL_LANGUAGES))
+            for qid, entity in results.get('entities', {}).items():
+                if 'missing' not in entity:
+                    entities[qid] = entity
+        return entities
+
+    # Function to get the labels of entities that are not known yet
+    def fetchLabels(self, qids):
+        with self.lock:
+            unknown = [x for x in dict.fromkeys(qids) if x not in self.labels]
+        if unknown:
+            entities = self.entities(unknown, 'items', 'labels')
+            with self.lock:
+                for qid in unknown:
+                    self.labels[qid] = dumpText(entities[qid].get('labels', {})) if qid in entities else None
+
+    # Function to get the label of an entity (the ID if it has no label, as the label service does)
+    def label(self, qid):
+        return self.labels.get(qid) or qid
+
+    # Function to get the type of an entity
+    @staticmethod
+    def entityType(entity):
+        return 'human' if 5 in claimIds(entity, 'P31') else 'place' if claimValues(entity, 'P625') else None
+
+    # Function to get entities as SPARQL bindings (of the given type, if any), fetching the labels of their genders
+    def toBindings(self, entities, type=None):
+        entities = [x for x in entities if not type or self.entityType(x) == type]
+        self.fetchLabels([f'Q{x}' for entity in entities for x in claimIds(entity, 'P21')[:1]])
+        results = []
+        for entity in entities:
+            qid = entity['id']
+            result = {'item': {'value': f'http://www.wikidata.org/entity/{qid}'},
+                      'itemLabel': {'value': dumpText(entity.get('labels', {})) or qid}}
+            images = claimValues(entity, 'P18')
+            births = [dumpTime(x) for x in claimValues(entity, 'P569')]
+            deaths = [dumpTime(x) for x in claimValues(entity, 'P570')]
+            genders = claimIds(entity, 'P21')
+            coordinates = [x for x in claimValues(entity, 'P625') if x.get('globe', '').endswith('/Q2')]
+            values = (dumpText(entity.get('descriptions', {})),
+                      f'http://commons.wikimedia.org/wiki/Special:FilePath/{urllib.parse.quote(images[0])}' if images else None,
+                      births[0] if births else None, deaths[0] if deaths else None,
+                      self.label(f'Q{genders[0]}') if genders else None,
+                      f'Point({coordinates[0]["longitude"]} {coordinates[0]["latitude"]})' if coordinates else None)
+            for name, value in zip(('itemDescription', 'image', 'birth', 'death', 'genderLabel', 'geo'), values):
+                if value:
+                    result[name] = {'value': value}
+            results.append(result)
+        return results
+
+    # Function to get entities as SPARQL bindings
+    def bindings(self, qids, type=None):
+        entities = self.entities([f'Q{x}' for x in qids], 'items')
+        return self.toBindings([entities[f'Q{x}'] for x in qids if f'Q{x}' in entities], type)
+
+    # Function to search humans or places by label or alias
+    def search(self, name, type):
+        return self.searchBatch([name], type)[name]
+
+    # Function to search many names, fetching the entities found for all of them together
+    def searchBatch(self, names, type):
+        found = {}
+        for name in dict.fromkeys(names):
+            results = self.query('search', action='wbsearchentities', search=name, language='en', type='item', limit=50)
+            found[name] = [x['id'] for x in results.get('search', [])]
+        entities = self.entities([qid for qids in found.values() for qid in qids], 'search')
+        type = 'human' if type == 'Q5' else 'place'
+        return {name: self.toBindings([entities[x] for x in qids if x in entities], type) for name, qids in found.items()}
+
+    # Function to find entities by VIAF ID
+    def viaf(self, viaf):
+        return self.viafBatch([viaf])[viaf]
+
+    # Function to find entities by many VIAF IDs, with haswbstatement searches
+    def viafBatch(self, viafs):
+        found = {viaf: [] for viaf in viafs}
+        for i in range(0, len(viafs), self.viafBatchSize):
+            results = self.query('viaf', action='query', list='search', srnamespace=0, srlimit=50,
+                                 srsearch='haswbstatement:' + '|'.join(f'P214={x}' for x in viafs[i:i + self.viafBatchSize]))
+            entities = self.entities([x['title'] for x in results.get('query', {}).get('search', [])], 'viaf')
+            for entity in {x['id']: x for x in entities.values()}.values():
+                for viaf in claimValues(entity, 'P214'):
+                    if viaf in found:
+                        found[viaf].append(entity)
+        return {viaf: self.toBindings(entities) for viaf, entities in found.items()}
+
+    # Function to get the statements of an entity, as getStatements returns them
+    def statements(self, qid):
+        return self.statementsBatch([qid])[qid]
+
+    # Function to get the statements of many entities
+    def statementsBatch(self, qids):
+        entities = self.entities(qids, 'statements')
+        self.fetchLabels([f'Q{x}' for entity in entities.values() for x in claimIds(entity, 'P31')[:1]])
+        statements = {}
+        for qid in qids:
+            classes = claimIds(entities[qid], 'P31') if qid in entities else []
+            if not classes:
+                statements[qid] = (None, None, None, None, None, None, None, None)
+                continue
+            result = self.toBindings([entities[qid]])[0]
+            values = [result[x]['value'] if x in result else None
+                      for x in ('itemLabel', 'itemDescription', 'image', 'birth', 'death', 'genderLabel')]
+            statements[qid] = (*values, self.label(f'Q{classes[0]}'), result['geo']['value'] if 'geo' in result else None)
+        return statements
+
+    # Function to get the birth country of a person outside Europe, as getBirthCountry returns it
+    def birthCountry(self, qid):
+        return self.birthCountryBatch([qid])[qid]
+
+    # Function to get the birth countries of many people (from the countries of their birthplaces and the
+    # continents of these countries)
+    def birthCountryBatch(self, qids):
+        people = self.entities(qids, 'country', 'claims')
+        birthplaces = {qid: [f'Q{x}' for x in claimIds(entity, 'P19')] for qid, entity in people.items()}
+        places = self.entities([x for y in birthplaces.values() for x in y], 'country', 'claims')
+        countries = self.entities([f'Q{x}' for place in places.values() for x in claimIds(place, 'P17')], 'country', 'claims')
+        self.fetchLabels(countries)
+
+        results = {}
+        for qid in qids:
+            results[qid] = next((self.label(f'Q{country}') for place in birthplaces.get(qid, []) if place in places
+                                 for country in claimIds(places[place], 'P17')
+                                 if claimIds(countries.get(f'Q{country}', {}), 'P30')
+                                 and 46 not in claimIds(countries[f'Q{country}'], 'P30')), False)
+        return results
+
+# Early-modern spellings and abbreviations, with their modern form
+SPELLINGS = {
+    'ld': 'lord', 'lds': 'lords', 'neice': 'niece', 'sr': 'sir', 'kt': 'knight', 'bt': 'baronet',
+    'dr': 'doctor', 'capt': 'captain', 'col': 'colonel', 'st': 'saint', 'mr': 'mister', 'mrs': 'mistress',
+    'wm': 'william', 'jno': 'john', 'geo': 'george', 'chas': 'charles', 'thos': 'thomas', 'jas': 'james',
+    'benj': 'benjamin', 'edw': 'edward', 'richd': 'richard', 'robt': 'robert', 'saml': 'samuel',
+    'ctss': 'countess', 'dss': 'duchess', 'visct': 'viscount', 'bp': 'bishop', 'abp': 'archbishop',
+}
+
+# Particles and titles left out of the phonetic keys of names (after the spellings above)
+PARTICLES = {'of', 'the', 'and', 'de', 'du', 'la', 'le', 'da', 'di', 'van', 'von', 'der', 'den', 'mister', 'mistress',
+             'miss', 'master', 'doctor', 'sir', 'lord', 'lady', 'captain', 'colonel', 'revd', 'rev', 'esq', 'mons', 'monsr',
+             'monsieur', 'madam', 'madame', 'signior', 'signor'}
+
+# Function to normalize a name for matching (accents, long s, case, punctuation, spellings)
+def normalizeName(name):
+    name = name.replace('ſ', 's').replace('æ', 'ae').replace('Æ', 'Ae').replace('œ', 'oe').replace('Œ', 'Oe')
+    name = ''.join(x for x in unicodedata.normalize('NFKD', name) if not unicodedata.combining(x))
+    tokens = re.sub(r'[^\w]+', ' ', name.casefold()).split()
+    return ' '.join(SPELLINGS.get(x, x) for x in tokens)
+
+# Function to get the phonetic code of a token of a normalized name, folding early-modern spellings (i/j/y, u/v, ph/f,
+# soft c/s, hard c/k/q, z/s, silent h after a consonant, final e and double letters)
+def phoneticCode(token):
+    code = re.sub(r'c(?=[eiy])', 's', token.replace('ph', 'f'))
+    code = code.translate(str.maketrans('jyvcqz', 'iiukks'))
+    code = re.sub(r'(?<=[^aeiou])h', '', code)
+    code = re.sub(r'(.)\1+', r'\1', code)
+    return code[:-1] if len(code) > 3 and code.endswith('e') else code
+
+# Function to get the phonetic key of a name (the phonetic codes of its tokens, without particles and titles)
+def phoneticKey(name):
+    return ' '.join(phoneticCode(x) for x in normalizeName(name).split() if x not in PARTICLES)
+
+# Function to check whether two phonetic keys probably name the same entity: the same number of tokens (at least two,
+# as a surname alone is too ambiguous), each at least CLUSTER_SIMILARITY similar to the token in the same place or
+# an initial of it (e.g. D. of Marlborough and Duke of Marlborough), with at least one pair of tokens not initials
+def similarKeys(key, other):
+    tokens, otherTokens = key.split(), other.split()
+    pairs = list(zip(tokens, otherTokens))
+    return len(tokens) == len(otherTokens) > 1 and any(len(x) > 1 and len(y) > 1 for x, y in pairs) and all(
+        x == y or (len(x) == 1 and y.startswith(x)) or (len(y) == 1 and x.startswith(y))
+        or difflib.SequenceMatcher(None, x, y).ratio() >= CLUSTER_SIMILARITY for x, y in pairs)
+
+# Function to get the character trigrams of a normalized name, folding i/j/y, u/v and double letters
+def nameGrams(name):
+    key = re.sub(r'(.)\1', r'\1', name.replace('j', 'i').replace('y', 'i').replace('v', 'u'))
+    key = f' {key} '
+    return set(key[i:i + 3] for i in range(len(key) - 2))
+
+# Inverted index of character trigrams and tokens over labels and aliases
+class NameIndex:
+    def __init__(self):
+        self.docs = []
+        self.grams = {}
+        self.tokens = {}
+        self.seen = set()
+
+    # Function to add a label or alias of a Wikidata entity (type is Q5, Q27096213 or None if unknown)
+    def add(self, qid, type, name):
+        name = normalizeName(name)
+        if not name or (qid, type, name) in self.seen:
+            return
+        self.seen.add((qid, type, name))
+        grams = nameGrams(name)
+        tokens = set(name.split())
+        doc = len(self.docs)
+        self.docs.append((qid, type, len(grams), tokens))
+        for gram in grams:
+            self.grams.setdefault(gram, []).append(doc)
+        for token in tokens:
+            self.tokens.setdefault(token, []).append(doc)
+
+    # Function to get the top candidates for a name (NAME_INDEX_TOP unless given), ranked by trigram and token similarity
+    def search(self, name, type=None, top=None):
+        name = normalizeName(name)
+        grams = nameGrams(name)
+        tokens = set(name.split())
+
+        # Count shared trigrams and tokens of each indexed name
+        shared = {}
+        for gram in grams:
+            for doc in self.grams.get(gram, ()):
+                shared[doc] = shared.get(doc, 0) + 1
+        sharedTokens = {}
+        for token in tokens:
+            for doc in self.tokens.get(token, ()):
+                sharedTokens[doc] = sharedTokens.get(doc, 0) + 1
+
+        # Keep the best score of each entity
+        scores = {}
+        for doc, count in shared.items():
+            qid, docType, docGrams, docTokens = self.docs[doc]
+            if type and docType and docType != type:
+                continue
+            score = 0.7 * 2 * count / (len(grams) + docGrams) \
+                + 0.3 * sharedTokens.get(doc, 0) / len(tokens | docTokens)
+            if score > scores.get(qid, 0):
+                scores[qid] = score
+        return sorted(scores.items(), key=lambda x: -x[1])[:top or NAME_INDEX_TOP]
+
+# Function to build the name index from cached Wikidata results, the local index and matched entities
+def buildNameIndex(matched=(), heldOut=()):
+    index = NameIndex()
+
+    # Searches, VIAF IDs and Wikidata IDs of the held-out (key, entity) pairs, whose cached responses are left out
+    heldOutSearches = set()
+    heldOutIds = set()
+    for key, entity in heldOut:
+        heldOutSearches.update(queryKey(x) for x in [key] + list(nameVariants(key, entity)))
+        heldOutIds.update(x for x in (entity.get('viaf'), (entity.get('iri') or '').split('/')[-1]) if x)
+
+    # Labels of cached search results (the type is in the query) and of other cached results
+    if responseCache:
+        with responseCache.lock:
+            rows = responseCache.db.execute('SELECT query, body FROM responses').fetchall()
+        for query, body in rows:
+            # Skip the Action API responses, which are not shaped like SPARQL results
+            if query.startswith(ActionEngine.cachePrefix):
+                continue
+            search = re.search(r'mwapi:search "([^"]*)"', query)
+            if (search and queryKey(search[1]) in heldOutSearches) or (not search and heldOutIds
+                    and heldOutIds & set(re.findall(r'"([^"]+)"', query) + re.findall(r'wd:(Q\d+)', query))):
+                continue
+            typeMatch = re.search(r'wdt:P279\* wd:(Q\d+)', query)
+            for entity in json.loads(zlib.decompress(body))['results']['bindings']:
+                if 'item' in entity and 'itemLabel' in entity:
+                    index.add(entity['item']['value'].split('/')[-1], typeMatch[1] if typeMatch else None,
+                              entity['itemLabel']['value'])
+
+    # Labels and aliases of the local Wikidata index
+    if localIndex:
+        with localIndex.lock:
+            rows = localIndex.db.execute('SELECT names.name, names.qid, entities.type FROM names '
+                                         'JOIN entities ON entities.qid = names.qid').fetchall()
+        for name, qid, type in rows:
+            index.add(f'Q{qid}', 'Q5' if type == 'human' else 'Q27096213', name)
+
+    # Names and aliases of people and places that were already matched
+    for entities, type in matched:
+        for key, entity in entities.items():
+            if entity.get('iri'):
+                for name in [key, entity['name']] + entity['aliases']:
+                    index.add(entity['iri'].split('/')[-1], type, name)
+
+    print(f'   Name index:   {len(index.docs)} names of {len(set(x[0] for x in index.docs))} entities\n')
+    return index
+
+nameIndex = None
+
+# Local stub of the Wikidata SPARQL endpoint, replaying recorded responses and generating the missing ones,
+# and of the Action API, generating a consistent set of entities
+class StubEndpoint(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    recordings = None
+    lock = threading.Lock()
+    random = random.Random(0)
+
+    # Function to start the stub endpoint in a background thread and return its base URL
+    @classmethod
+    def start(cls, recordingsPath):
+        if os.path.exists(recordingsPath):
+            cls.recordings = sqlite3.connect(f'file:{recordingsPath}?mode=ro', uri=True, check_same_thread=False)
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), cls)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return f'http://127.0.0.1:{server.server_port}'
+
+    # Function to get the recorded response of a query, if any
+    @classmethod
+    def replay(cls, query):
+        if not cls.recordings:
+            return None
+        with cls.lock:
+            row = cls.recordings.execute('SELECT body FROM responses WHERE query = ?', (' '.join(query.split()),)).fetchone()
+        return zlib.decompress(row[0]).decode('utf-8') if row else None
+
+    # Function to answer a batch of searches with the recorded or generated results of the search of each name
+    @classmethod
+    def batch(cls, query):
+        type = re.search(r'wdt:P279\* wd:(Q\d+)', query)[1]
+        bindings = []
+        for name in re.findall(r'BIND\("([^"]*)" AS \?term\)', query):
+            search = searchQuery(name, type)
+            for entity in json.loads(cls.replay(search) or cls.generate(search))['results']['bindings']:
+                bindings.append(dict(entity, term={'value': name}))
+        return json.dumps({'head': {'vars': []}, 'results': {'bindings': bindings}})
+
+    # Labels of the entities found by generated searches, VIAF IDs of the entities found by VIAF ID,
+    # and labels and claims of the genders, classes, countries and continents of the generated entities
+    actionLabels = {}
+    actionViafs = {}
+    actionEntities = {'Q5': ('human', {}), 'Q515': ('city', {}), 'Q6581097': ('male', {}), 'Q6581072': ('female', {}),
+                      'Q145': ('United Kingdom', {'P30': 'Q46'}), 'Q419': ('Peru', {'P30': 'Q18'}),
+                      'Q46': ('Europe', {}), 'Q18': ('South America', {})}
+
+    # Function to generate an entity of the Wikidata API (people have even IDs and places odd ones)
+    @classmethod
+    def entity(cls, qid):
+        def claim(value, type='wikibase-entityid'):
+            if type == 'wikibase-entityid':
+                value = {'entity-type': 'item', 'numeric-id': int(value[1:]), 'id': value}
+            return {'mainsnak': {'snaktype': 'value', 'datavalue': {'value': value, 'type': type}}, 'rank': 'normal'}
+
+        number = int(qid[1:])
+        with cls.lock:
+            label = cls.actionLabels.get(qid, f'Label of {qid}')
+            viaf = cls.actionViafs.get(qid)
+        if qid in cls.actionEntities:
+            label, claims = cls.actionEntities[qid]
+            claims = {prop: [claim(value)] for prop, value in claims.items()}
+        elif number % 2 == 0:
+            claims = {'P31': [claim('Q5')], 'P21': [claim('Q6581097' if number % 4 else 'Q6581072')],
+                      'P569': [claim({'time': f'+{1600 + number % 150}-01-01T00:00:00Z'}, 'time')],
+                      'P19': [claim(f'Q{number % 1000 * 2 + 1}')]}
+            if viaf:
+                claims['P214'] = [claim(viaf, 'string')]
+        else:
+            claims = {'P31': [claim('Q515')], 'P17': [claim('Q419' if number % 10 == 1 else 'Q145')],
+                      'P625': [claim({'latitude': number % 1600 / 10 - 80, 'longitude': number % 3600 / 10 - 180,
+                                      'globe': 'http://www.wikidata.org/entity/Q2'}, 'globecoordinate')]}
+        return {'type': 'item', 'id': qid, 'labels': {'en': {'language': 'en', 'value': label}},
+                'descriptions': {'en': {'language': 'en', 'value': f'generated {"place" if number % 2 else "person"}'}},
+                'claims': claims}
+
+    # Function to answer an Action API request (entity searches, haswbstatement searches by VIAF ID and entities by ID)
+    @classmethod
+    def action(cls, params):
+        results = {}
+        if params.get('action') == 'wbsearchentities':
+            name = params.get('search', '')
+            results['search'] = []
+            for i in range(zlib.crc32(name.encode('utf-8')) % 8):
+                qid = f'Q{zlib.crc32(f"{name} {i}".encode("utf-8")) % 100000000}'
+                with cls.lock:
+                    cls.actionLabels.setdefault(qid, name if i == 0 else f'{name} ({i})')
+                results['search'].append({'id': qid, 'label': cls.actionLabels[qid]})
+        elif params.get('list') == 'search':
+            results['query'] = {'search': []}
+            for viaf in re.findall(r'P214=(\w+)', params.get('srsearch', '')):
+                number = zlib.crc32(viaf.encode('utf-8'))
+                if number % 3:
+                    qid = f'Q{number % 100000000 // 2 * 2}'
+                    with cls.lock:
+                        cls.actionLabels.setdefault(qid, f'VIAF {viaf}')
+                        cls.actionViafs[qid] = viaf
+                    results['query']['search'].append({'ns': 0, 'title': qid})
+        elif params.get('action') == 'wbgetentities':
+            results['entities'] = {qid: cls.entity(qid) for qid in params.get('ids', '').split('|') if qid}
+        else:
+            results['error'] = {'code': 'badvalue', 'info': 'Unsupported request'}
+        return json.dumps(results)
+
+    # Function to generate the results of a query that was not recorded
+    @staticmethod
+    def generate(query):
+        def item(seed, label, type='Q5'):
+            number = zlib.crc32(seed.encode('utf-8'))
+            entity = {'item': {'value': f'http://www.wikidata.org/entity/Q{number % 100000000}'},
+                      'itemLabel': {'value': label},
+                      'itemDescription': {'value': f'generated {"person" if type == "Q5" else "place"}'}}
+            if type == 'Q5':
+                entity['birth'] = {'value': f'{1600 + number % 150}-01-01T00:00:00Z'}
+                entity['genderLabel'] = {'value': 'male' if number % 4 else 'female'}
+            elif '?geo' in query:
+                entity['geo'] = {'value': f'Point({number % 3600 / 10 - 180} {number // 3600 % 1600 / 10 - 80})'}
+            return entity
+
+        bindings = []
+        typeMatch = re.search(r'wdt:P279\* wd:(Q\d+)', query)
+        type = typeMatch[1] if typeMatch else 'Q5'
+        if 'mwapi:search' in query:
+            name = re.search(r'mwapi:search "([^"]*)"', query)[1]
+            for i in range(zlib.crc32(name.encode('utf-8')) % 4):
+                bindings.append(item(f'{name} {i}', name if i == 0 else f'{name} ({i})', type))
+        elif 'VALUES ?viaf' in query:
+            for viaf in re.findall(r'"([^"]+)"', query.split('VALUES ?viaf')[1].split('}')[0]):
+                if zlib.crc32(viaf.encode('utf-8')) % 3:
+                    bindings.append(dict(item(viaf, f'VIAF {viaf}'), viaf={'value': viaf}))
+        elif 'wdt:P214 "' in query:
+            viaf = re.search(r'wdt:P214 "([^"]*)"', query)[1]
+            if zlib.crc32(viaf.encode('utf-8')) % 3:
+                bindings.append(item(viaf, f'VIAF {viaf}'))
+        else:
+            for qid in re.findall(r'wd:(Q\d+)', query.split('VALUES')[1]) if 'VALUES' in query else []:
+                entity = item(qid, f'Label of {qid}', type)
+                entity['item'] = {'value': f'http://www.wikidata.org/entity/{qid}'}
+                if '?countryLabel' in query:
+                    if zlib.crc32(qid.encode('utf-8')) % 10 == 0:
+                        bindings.append({'item': entity['item'], 'countryLabel': {'value': 'Peru'}})
+                    continue
+                if '?classLabel' in query:
+                    entity['classLabel'] = {'value': 'human'}
+                bindings.append(entity)
+        return json.dumps({'head': {'vars': []}, 'results': {'bindings': bindings}})
+
+    def do_GET(self):
+        time.sleep(STUB_LATENCY)
+
+        # Inject errors
+        with self.lock:
+            failed = self.random.random() < STUB_ERROR_RATE
+            throttled = self.random.random() < 0.5
+        if failed:
+            self.send_response(429 if throttled else 503)
+            if throttled:
+                self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        # Answer Action API requests, or replay the recorded response of a query, or generate one
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == '/w/api.php':
+            body = self.action(dict(urllib.parse.parse_qsl(url.query))).encode('utf-8')
+        else:
+            query = urllib.parse.parse_qs(url.query).get('query', [''])[0]
+            body = (self.batch(query) if '?term' in query else self.replay(query) or self.generate(query)).encode('utf-8')
+
+        if 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            body = gzip.compress(body)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/sparql-results+json')
+        if 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+# Function to run a SPARQL query, using cached responses when available (unless cache is False)
+def sparqlQuery(query, queryType, cache=True, retries=None):
+    # Normalize whitespace so that equivalent queries share a cache entry
+    key = ' '.join(query.split())
+
+    if responseCache and cache:
+        results = responseCache.get(key, queryType)
+        if results is not None:
+            metrics.add('cacheHits')
+            return results
+        metrics.add('cacheMisses')
+
+    if CACHE_OFFLINE:
+        return None
+
+    # Load query URL
+    results = loadURL(f'{WD_URL}{urllib.parse.quote(query)}&format=json', retries=retries)
+    if results:
+        metrics.add(f'bytes.{queryType}', len(results.encode('utf-8')))
+
+    if responseCache and cache and results:
+        responseCache.put(key, queryType, results)
+    return results
+
+# Function to parse the bindings of SPARQL results
+def parseResults(results):
+    with metrics.timer('parse'):
+        return json.loads(results)['results']['bindings']
+
+# Function to make the SPARQL query of a Wikidata entity search
+def searchQuery(name, type):
+    # Get the coordinates of places to rank them by distance
+    geo = ' ?geo' if GEO_RANKING and type != 'Q5' else ''
+    geoPattern = 'OPTIONAL {?item wdt:P625 ?geo}' if geo else ''
+
+    # Define SPARQL query
+    return f'\nSELECT DISTINCT ?item ?itemLabel ?itemDescription ?image ?birth ?death ?genderLabel{geo}\
+                WHERE {{\
+                ?item wdt:P31/wdt:P279* wd:{type}.\
+                OPTIONAL {{?item wdt:P18 ?image}}\
+                OPTIONAL {{?item wdt:P21 ?gender}}\
+                OPTIONAL {{?item wdt:P569 ?birth}}\
+                OPTIONAL {{?item wdt:P570 ?death}}\
+                {geoPattern}\
+                SERVICE wikibase:mwapi {{\
+                      bd:serviceParam wikibase:endpoint "www.wikidata.org";\
+                                      wikibase:api "EntitySearch";\
+                                      mwapi:search "{name}";\
+                                      mwapi:language "en".\
+                      ?item wikibase:apiOutputItem mwapi:item.\
+                      ?num wikibase:apiOrdinal true.\
+                }}\
+                SERVICE wikibase:label {{ bd:serviceParam wikibase:language "[AUTO_LANGUAGE],en,la,it,fr,es,de". }}\
+                }}'
+
+# Function to make the SPARQL query of several Wikidata entity searches, each result binding ?term to its search
+def searchBatchQuery(names, type):
+    geo = ' ?geo' if GEO_RANKING and type != 'Q5' else ''
+    geoPattern = 'OPTIONAL {?item wdt:P625 ?geo}' if geo else ''
+
+    # One entity search for each name, in a union
+    searches = ' UNION '.join(f'{{\
+                SERVICE wikibase:mwapi {{\
+                      bd:serviceParam wikibase:endpoint "www.wikidata.org";\
+                                      wikibase:api "EntitySearch";\
+                                      mwapi:search "{name}";\
+                                      mwapi:language "en".\
+                      ?item wikibase:apiOutputItem mwapi:item.\
+                      ?num wikibase:apiOrdinal true.\
+                }}\
+                BIND("{name}" AS ?term)\
+                }}' for name in names)
+
+    # Define SPARQL query
+    return f'\nSELECT DISTINCT ?term ?item ?itemLabel ?itemDescription ?image ?birth ?death ?genderLabel{geo}\
+                WHERE {{\
+                {searches}\
+                ?item wdt:P31/wdt:P279* wd:{type}.\
+                OPTIONAL {{?item wdt:P18 ?image}}\
+                OPTIONAL {{?item wdt:P21 ?gender}}\
+                OPTIONAL {{?item wdt:P569 ?birth}}\
+                OPTIONAL {{?item wdt:P570 ?death}}\
+                {geoPattern}\
+                SERVICE wikibase:label {{ bd:serviceParam wikibase:language "[AUTO_LANGUAGE],en,la,it,fr,es,de". }}\
+                }}'
+
+# Function to perform a Wikidata query
+@metrics.timed
+def wdQuery(name, type):
+    # Search the local name index instead of the Wikidata entity search
+    if nameIndex:
+        return wdItemsQuery([qid for qid, score in nameIndex.search(name, type)], type)
+
+    # Ask the lookup engine instead (the local index or the Action API)
+    if lookupEngine:
+        return lookupEngine.search(name, type)
+
+    # Run query
+    results = sparqlQuery(searchQuery(name, type), 'search')
+
+    # Return results
+    if results:
+        return parseResults(results)
+    else:
+        print(red(f'   Not found: {name}'))
+    return []
+
+# Function to perform the Wikidata searches of many names with a single query, returning the results of each name
+# (names with cached results are taken from the cache, and the names of a batch that fails are searched one by one)
+@metrics.timed
+def wdSearchBatchQuery(names, type):
+    names = list(dict.fromkeys(names))
+    entities = {}
+
+    # Search each name on its own in the name index, or ask the lookup engine (the local index or the Action API)
+    if nameIndex or len(names) == 1 or CACHE_OFFLINE:
+        return {name: wdQuery(name, type) for name in names}
+    if lookupEngine:
+        return lookupEngine.searchBatch(names, type)
+
+    # Take the results of names searched before from the cache
+    pending = []
+    for name in names:
+        results = responseCache.get(' '.join(searchQuery(name, type).split()), 'search') if responseCache else None
+        if results is not None:
+            metrics.add('cacheHits')
+            entities[name] = parseResults(results)
+        else:
+            pending.append(name)
+
+    if len(pending) > 1:
+        # Run query (retrying it once at most, as its names are searched one by one if it times out)
+        try:
+            results = sparqlQuery(searchBatchQuery(pending, type), 'search', cache=False, retries=1)
+            bindings = parseResults(results) if results else None
+        except (urllib.error.URLError, ValueError, KeyError):
+            bindings = None
+
+        # Group results by search term, and cache them as the results of the search of each name
+        if bindings is not None:
+            metrics.add('searchBatches')
+            if responseCache:
+                metrics.add('cacheMisses', len(pending))
+            found = {name: [] for name in pending}
+            for entity in bindings:
+                term = entity.pop('term', {}).get('value')
+                if term in found:
+                    found[term].append(entity)
+            for name in pending:
+                if responseCache:
+                    responseCache.put(' '.join(searchQuery(name, type).split()), 'search',
+                                      json.dumps({'head': {'vars': []}, 'results': {'bindings': found[name]}}))
+                entities[name] = found[name]
+            pending = []
+        else:
+            metrics.add('searchBatchFallbacks')
+
+    # Search the other names one by one
+    for name in pending:
+        entities[name] = wdQuery(name, type)
+    return entities
+
+# Function to get Wikidata entities of a type by ID, in the given order
+@metrics.timed
+def wdItemsQuery(qids, type):
+    if not qids:
+        return []
+
+    # Ask the lookup engine instead (the local index or the Action API)
+    if lookupEngine:
+        return lookupEngine.bindings([int(qid[1:]) for qid in qids], 'human' if type == 'Q5' else 'place')
+
+    # Define SPARQL query
+    values = ' '.join(f'wd:{qid}' for qid in qids)
+    wdQuery = f'\nSELECT DISTINCT ?item ?itemLabel ?itemDescription ?image ?birth ?death ?genderLabel\
+                WHERE {{\
+                VALUES ?item {{ {values} }}\
+                ?item wdt:P31/wdt:P279* wd:{type}.\
+                OPTIONAL {{?item wdt:P18 ?image}}\
+                OPTIONAL {{?item wdt:P21 ?gender}}\
+                OPTIONAL {{?item wdt:P569 ?birth}}\
+                OPTIONAL {{?item wdt:P570 ?death}}\
+                SERVICE wikibase:label {{ bd:serviceParam wikibase:language "[AUTO_LANGUAGE],en,la,it,fr,es,de". }}\
+                }}'
+
+    # Run query
+    results = sparqlQuery(wdQuery, 'items')
+
+    # Return results in the order of the IDs
+    if results:
+        order = {qid: i for i, qid in enumerate(qids)}
+        return sorted(parseResults(results),
+                      key=lambda x: order.get(x['item']['value'].split('/')[-1], len(order)))
+    return []
+
+# Function to perform a Wikidata query
+@metrics.timed
+def wdViafQuery(viaf, type):
+    # Ask the lookup engine instead (the local index or the Action API)
+    if lookupEngine:
+        return lookupEngine.viaf(viaf)
+
+    # Define SPARQL query
+    wdQuery = f'\nSELECT DISTINCT ?item ?itemLabel ?itemDescription ?image ?birth ?death ?genderLabel\
+                WHERE {{\
+                ?item wdt:P214 "{viaf}".\
+                OPTIONAL {{?item wdt:P18 ?image}}\
+                OPTIONAL {{?item wdt:P21 ?gender}}\
+                OPTIONAL {{?item wdt:P569 ?birth}}\
+                OPTIONAL {{?item wdt:P570 ?death}}\
+                SERVICE wikibase:label {{ bd:serviceParam wikibase:language "[AUTO_LANGUAGE],en,la,it,fr,es,de". }}\
+                }}'
+
+    # Run query
+    results = sparqlQuery(wdQuery, 'viaf')
+
+    # Return results
+    if results:
+        return parseResults(results)
+    else:
+        print(red(f'   Not found: {viaf}'))
+    return []
+
+# Function to resolve many VIAF IDs with a single Wikidata query
+@metrics.timed
+def wdViafBatchQuery(viafs, type):
+    # Ask the lookup engine instead (the local index or the Action API)
+    if lookupEngine:
+        return lookupEngine.viafBatch(viafs)
+
+    # Define SPARQL query
+    values = ' '.join(f'"{viaf}"' for viaf in viafs)
+    wdQuery = f'\nSELECT DISTINCT ?viaf ?item ?itemLabel ?itemDescription ?image ?birth ?death ?genderLabel\
+                WHERE {{\
+                VALUES ?viaf {{ {values} }}\
+                ?item wdt:P214 ?viaf.\
+                OPTIONAL {{?item wdt:P18 ?image}}\
+                OPTIONAL {{?item wdt:P21 ?gender}}\
+                OPTIONAL {{?item wdt:P569 ?birth}}\
+                OPTIONAL {{?item wdt:P570 ?death}}\
+                SERVICE wikibase:label {{ bd:serviceParam wikibase:language "[AUTO_LANGUAGE],en,la,it,fr,es,de". }}\
+                }}'
+
+    # Run query
+    results = sparqlQuery(wdQuery, 'viaf')
+
+    # Group results by VIAF ID, without it, as the single VIAF query returns them (IDs without results get an empty list)
+    entities = {viaf: [] for viaf in viafs}
+    if results:
+        for entity in parseResults(results):
+            entities[entity.pop('viaf')['value']].append(entity)
+    return entities
+
+# Function to perform a Wikidata query
+@metrics.timed
+def getStatements(qid):
+    # Ask the lookup engine instead (the local index or the Action API)
+    if lookupEngine:
+        return lookupEngine.statements(qid)
+
+    # Define SPARQL query
+    wdQuery = f'\nSELECT DISTINCT ?item ?itemLabel ?itemDescription ?image ?birth ?death ?genderLabel ?classLabel ?geo\
+                WHERE {{\
+                ?item wdt:P31 ?class.\
+                OPTIONAL {{?item wdt:P18 ?image}}\
+                OPTIONAL {{?item wdt:P21 ?gender}}\
+                OPTIONAL {{?item wdt:P569 ?birth}}\
+                OPTIONAL {{?item wdt:P570 ?death}}\
+                OPTIONAL {{?item wdt:P625 ?geo}}\
+                VALUES (?item) {{\
+                    (wd:{qid})\
+                }}\
+                SERVICE wikibase:label {{ bd:serviceParam wikibase:language "[AUTO_LANGUAGE],en,la,it,fr,es,de". }}\
+                }}'
+
+    # Run query
+    results = sparqlQuery(wdQuery, 'statements')
+
+    # Return results
+    if results:
+        for entity in parseResults(results):
+            label = entity["itemLabel"]["value"] if "itemLabel" in entity else None
+            desc = entity["itemDescription"]["value"] if "itemDescription" in entity else None
+            image = entity["image"]["value"] if "image" in entity else None
+            birth = entity["birth"]["value"] if "birth" in entity else None
+            death = entity["death"]["value"] if "death" in entity else None
+            gender = entity["genderLabel"]["value"] if "genderLabel" in entity else None
+            instanceOf = entity["classLabel"]["value"] if "classLabel" in entity else None
+            geo = entity["geo"]["value"] if "geo" in entity else None
+            return((label, desc, image, birth, death, gender, instanceOf, geo))
+    else:
+        print(red(f'   Not found: {qid}'))
+    return (None, None, None, None, None, None, None, None)
+
+# Function to perform a Wikidata query
+@metrics.timed
+def getBirthCountry(qid):
+    # Ask the lookup engine instead (the local index or the Action API)
+    if lookupEngine:
+        return lookupEngine.birthCountry(qid)
+
+    # Define SPARQL query
+    wdQuery = f'\nSELECT DISTINCT ?countryLabel\
+                WHERE {{\
+                ?item wdt:P31 ?class.\
+                OPTIONAL {{?item wdt:P19 ?place.\
+                ?place wdt:P17 ?country.\
+                ?country wdt:P30 ?continent.}}\
+                FILTER NOT EXISTS {{?country wdt:P30 wd:Q46.}}\
+                VALUES (?item) {{\
+                    (wd:{qid})\
+                }}\
+                SERVICE wikibase:label {{ bd:serviceParam wikibase:language "[AUTO_LANGUAGE],en,la,it,fr,es,de". }}\
+                }}'
+
+    # Run query
+    results = sparqlQuery(wdQuery, 'country')
+
+    # Return results
+    if results:
+        for entity in parseResults(results):
+            return entity["countryLabel"]["value"] if "countryLabel" in entity else None
+    return False
+
+# Function to get the statements of many Wikidata IDs with a single query
+@metrics.timed
+def getStatementsBatch(qids):
+    # Ask the lookup engine instead (the local index or the Action API)
+    if lookupEngine:
+        return lookupEngine.statementsBatch(qids)
+
+    # Define SPARQL query
+    values = ' '.join(f'(wd:{qid})' for qid in qids)
+    wdQuery = f'\nSELECT DISTINCT ?item ?itemLabel ?itemDescription ?image ?birth ?death ?genderLabel ?classLabel ?geo\
+                WHERE {{\
+                ?item wdt:P31 ?class.\
+                OPTIONAL {{?item wdt:P18 ?image}}\
+                OPTIONAL {{?item wdt:P21 ?gender}}\
+                OPTIONAL {{?item wdt:P569 ?birth}}\
+                OPTIONAL {{?item wdt:P570 ?death}}\
+                OPTIONAL {{?item wdt:P625 ?geo}}\
+                VALUES (?item) {{\
+                    {values}\
+                }}\
+                SERVICE wikibase:label {{ bd:serviceParam wikibase:language "[AUTO_LANGUAGE],en,la,it,fr,es,de". }}\
+                }}'
+
+    # Run query
+    results = sparqlQuery(wdQuery, 'statements')
+
+    # Keep the first result of each item, as getStatements does
+    statements = {qid: (None, None, None, None, None, None, None, None) for qid in qids}
+    seen = set()
+    if results:
+        for entity in parseResults(results):
+            qid = entity["item"]["value"].split('/')[-1]
+            if qid in seen:
+                continue
+            seen.add(qid)
+            label = entity["itemLabel"]["value"] if "itemLabel" in entity else None
+            desc = entity["itemDescription"]["value"] if "itemDescription" in entity else None
+            image = entity["image"]["value"] if "image" in entity else None
+            birth = entity["birth"]["value"] if "birth" in entity else None
+            death = entity["death"]["value"] if "death" in entity else None
+            gender = entity["genderLabel"]["value"] if "genderLabel" in entity else None
+            instanceOf = entity["classLabel"]["value"] if "classLabel" in entity else None
+            geo = entity["geo"]["value"] if "geo" in entity else None
+            statements[qid] = (label, desc, image, birth, death, gender, instanceOf, geo)
+    return statements
+
+# Function to get the birth country of many Wikidata IDs with a single query
+@metrics.timed
+def getBirthCountryBatch(qids):
+    # Ask the lookup engine instead (the local index or the Action API)
+    if lookupEngine:
+        return lookupEngine.birthCountryBatch(qids)
+
+    # Define SPARQL query
+    values = ' '.join(f'(wd:{qid})' for qid in qids)
+    wdQuery = f'\nSELECT DISTINCT ?item ?countryLabel\
+                WHERE {{\
+                ?item wdt:P31 ?class.\
+                OPTIONAL {{?item wdt:P19 ?place.\
+                ?place wdt:P17 ?country.\
+                ?country wdt:P30 ?continent.}}\
+                FILTER NOT EXISTS {{?country wdt:P30 wd:Q46.}}\
+                VALUES (?item) {{\
+                    {values}\
+                }}\
+                SERVICE wikibase:label {{ bd:serviceParam wikibase:language "[AUTO_LANGUAGE],en,la,it,fr,es,de". }}\
+                }}'
+
+    # Run query
+    results = sparqlQuery(wdQuery, 'country')
+
+    # Keep the first result of each item, as getBirthCountry does
+    countries = {qid: False for qid in qids}
+    seen = set()
+    if results:
+        for entity in parseResults(results):
+            qid = entity["item"]["value"].split('/')[-1]
+            if qid in seen:
+                continue
+            seen.add(qid)
+            countries[qid] = entity["countryLabel"]["value"] if "countryLabel" in entity else None
+    return countries
+
+# Function to run a batched query over a list of Wikidata IDs in chunks
+def batchByQid(function, qids):
+    qids = sorted(set(qids))
+    results = {}
+    for i in range(0, len(qids), STATEMENTS_BATCH_SIZE):
+        results.update(function(qids[i:i + STATEMENTS_BATCH_SIZE]))
+    return results
+
+# Prefix of the IRIs of Wikidata entities
+WD_ENTITY = 'http://www.wikidata.org/entity/Q'
+
+# Compact record of a person or place, used like the dict it is read from and written to JSON: known fields are slots
+# (the IRI as the numeric ID of the entity, the aliases as a tuple of interned strings), other fields are in a dict,
+# and the names of the fields set are kept in order in a tuple shared by all records with the same fields
+class EntityRecord:
+    __slots__ = ('fields', 'extra', 'name', 'iri', 'viaf', 'aliases', 'desc', 'image', 'birth', 'death', 'gender',
+                 'lat', 'lon')
+    slots = frozenset(__slots__[2:])
+    layouts = {}
+
+    def __init__(self, entity=None):
+        self.fields = ()
+        self.extra = None
+        for name, value in (entity or {}).items():
+            self[name] = value
+
+    def __getitem__(self, name):
+        if name not in self.fields:
+            raise KeyError(name)
+        if name not in self.slots:
+            return self.extra[name]
+        value = getattr(self, name)
+        if name == 'iri' and type(value) is int:
+            return f'{WD_ENTITY}{value}'
+        if name == 'aliases' and type(value) is tuple:
+            return list(value)
+        return value
+
+    def __setitem__(self, name, value):
+        if name == 'iri' and isinstance(value, str) and re.fullmatch(r'[1-9]\d*', value[len(WD_ENTITY):]) \
+                and value.startswith(WD_ENTITY):
+            value = int(value[len(WD_ENTITY):])
+        elif name == 'aliases' and type(value) is list and all(type(x) is str for x in value):
+            value = tuple(sys.intern(x) for x in value)
+        elif name == 'gender' and type(value) is str:
+            value = sys.intern(value)
+
+        if name in self.slots:
+            setattr(self, name, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[name] = value
+        if name not in self.fields:
+            fields = self.fields + (name,)
+            self.fields = self.layouts.setdefault(fields, fields)
+
+    def __delitem__(self, name):
+        if name not in self.fields:
+            raise KeyError(name)
+        if name in self.slots:
+            delattr(self, name)
+        else:
+            del self.extra[name]
+        fields = tuple(x for x in self.fields if x != name)
+        self.fields = self.layouts.setdefault(fields, fields)
+
+    def __contains__(self, name):
+        return name in self.fields
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __repr__(self):
+        return repr(self.toDict())
+
+    def get(self, name, default=None):
+        return self[name] if name in self.fields else default
+
+    def keys(self):
+        return list(self.fields)
+
+    def items(self):
+        return [(name, self[name]) for name in self.fields]
+
+    # Function to get the record as a dict, with its fields in order (also used to write records to JSON)
+    def toDict(self):
+        return {name: self[name] for name in self.fields}
+
+# Append-only journal of entity updates on top of a JSON snapshot
+class Journal:
+    def __init__(self, path):
+        self.path = path
+        self.journalPath = f'{path}.journal'
+        self.file = None
+        self.unsynced = 0
+        self.dirty = False
+
+    # Function to load the JSON snapshot and replay the journal on top of it
+    def load(self):
+        try:
+            with open(self.path) as f:
+                entities = {key: EntityRecord(entity) for key, entity in json.load(f).items()}
+        except FileNotFoundError:
+            entities = {}
+
+        try:
+            with open(self.journalPath, 'rb+') as f:
+                end = 0
+                for line in f:
+                    # Stop at a line left incomplete by a crash, and cut it off so that new entries start on a line
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        f.truncate(end)
+                        break
+                    entities[entry['key']] = EntityRecord(entry['entity'])
+                    self.dirty = True
+                    end += len(line)
+                    if not line.endswith(b'\n'):
+                        f.write(b'\n')
+        except FileNotFoundError:
+            pass
+        return entities
+
+    # Function to append the new state of an entity to the journal
+    def write(self, key, entity):
+        with metrics.timer('persist'):
+            if not self.file:
+                self.file = open(self.journalPath, 'a')
+            self.file.write(json.dumps({'key': key, 'entity': entity}, default=EntityRecord.toDict) + '\n')
+            self.dirty = True
+            self.unsynced += 1
+            if self.unsynced >= JOURNAL_SYNC_EVERY:
+                self.sync()
+
+    # Function to sync the journal to disk
+    def sync(self):
+        if self.file:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        self.unsynced = 0
+
+    # Function to write all entities to a new JSON snapshot and empty the journal
+    def compact(self, entities):
+        with metrics.timer('persist'), open(f'{self.path}.tmp', 'w') as f:
+            json.dump(entities, f, default=EntityRecord.toDict)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f'{self.path}.tmp', self.path)
+
+        if self.file:
+            self.file.close()
+            self.file = None
+        if os.path.exists(self.journalPath):
+            os.remove(self.journalPath)
+        self.unsynced = 0
+        self.dirty = False
+
+    # Function to sync and close the journal
+    def close(self):
+        self.sync()
+        if self.file:
+            self.file.close()
+            self.file = None
+
+# Store of entities in SQLite, with the same interface as the journal: updates are upserted in batches, each in one
+# transaction, and each entity is kept as its JSON text (in the order added) so that the JSON export is unchanged
+class EntityStore:
+    def __init__(self, path):
+        self.path = path
+        self.pending = {}
+        self.dirty = False
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS entities (key TEXT PRIMARY KEY, position INTEGER, qid INTEGER, '
+                        'viaf TEXT, name TEXT, entity TEXT)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS aliases (key TEXT, alias TEXT, name TEXT)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS entities_position ON entities (position)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS entities_qid ON entities (qid)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS entities_viaf ON entities (viaf)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS entities_name ON entities (name)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS aliases_key ON aliases (key)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS aliases_name ON aliases (name)')
+        self.db.commit()
+
+    # Function to get the rows of an entity for the entities and aliases tables
+    @staticmethod
+    def rows(key, entity):
+        qid = (entity.get('iri') or '').split('/')[-1]
+        aliases = [(key, alias, normalizeName(alias)) for alias in dict.fromkeys(entity.get('aliases') or [])]
+        return (key, int(qid[1:]) if re.fullmatch(r'Q\d+', qid) else None, entity.get('viaf') or None,
+                normalizeName(entity.get('name') or key), json.dumps(entity, default=EntityRecord.toDict)), aliases
+
+    # Function to load all entities in the order they were added
+    def load(self):
+        self.sync()
+        return {key: EntityRecord(json.loads(entity))
+                for key, entity in self.db.execute('SELECT key, entity FROM entities ORDER BY position')}
+
+    # Function to queue the new state of an entity, upserting the queue when it is full
+    def write(self, key, entity):
+        with metrics.timer('persist'):
+            self.pending[key] = self.rows(key, entity)
+            self.dirty = True
+            if len(self.pending) >= JOURNAL_SYNC_EVERY:
+                self.sync()
+
+    # Function to upsert the queued entities in one transaction
+    def sync(self):
+        if not self.pending:
+            return
+        with metrics.timer('persist'), self.db:
+            position = self.db.execute('SELECT COALESCE(MAX(position), 0) FROM entities').fetchone()[0]
+            self.db.executemany('INSERT INTO entities VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+                                'qid = excluded.qid, viaf = excluded.viaf, name = excluded.name, entity = excluded.entity',
+                                [(row[0], position + i, *row[1:]) for i, (row, aliases) in
+                                 enumerate(self.pending.values(), 1)])
+            self.db.executemany('DELETE FROM aliases WHERE key = ?', [(key,) for key in self.pending])
+            self.db.executemany('INSERT INTO aliases VALUES (?, ?, ?)',
+                                [alias for row, aliases in self.pending.values() for alias in aliases])
+        metrics.add('storeTransactions')
+        self.pending = {}
+
+    # Function to replace all entities in one transaction
+    def compact(self, entities):
+        self.pending = {}
+        with metrics.timer('persist'), self.db:
+            self.db.execute('DELETE FROM entities')
+            self.db.execute('DELETE FROM aliases')
+            for i, (key, entity) in enumerate(entities.items(), 1):
+                row, aliases = self.rows(key, entity)
+                self.db.execute('INSERT INTO entities VALUES (?, ?, ?, ?, ?, ?)', (key, i, *row[1:]))
+                self.db.executemany('INSERT INTO aliases VALUES (?, ?, ?)', aliases)
+        self.dirty = False
+
+    # Function to find entities by Wikidata ID (e.g. Q312616), VIAF ID, or name or alias (normalized)
+    def find(self, qid=None, viaf=None, name=None):
+        self.sync()
+        if qid:
+            rows = self.db.execute('SELECT key, entity FROM entities WHERE qid = ? ORDER BY position',
+                                   (int(qid.split('/')[-1].lstrip('Q')),))
+        elif viaf:
+            rows = self.db.execute('SELECT key, entity FROM entities WHERE viaf = ? ORDER BY position', (str(viaf),))
+        else:
+            rows = self.db.execute('SELECT key, entity FROM entities WHERE name = ? OR key IN '
+                                   '(SELECT key FROM aliases WHERE name = ?) ORDER BY position',
+                                   (normalizeName(name), normalizeName(name)))
+        return {key: EntityRecord(json.loads(entity)) for key, entity in rows}
+
+    # Function to write all entities to a JSON file in the format of the JSON snapshots
+    def export(self, path):
+        self.sync()
+        with metrics.timer('persist'), open(f'{path}.tmp', 'w') as f:
+            f.write('{')
+            for i, (key, entity) in enumerate(self.db.execute('SELECT key, entity FROM entities ORDER BY position')):
+                f.write(f'{", " if i else ""}{json.dumps(key)}: {entity}')
+            f.write('}')
+        os.replace(f'{path}.tmp', path)
+
+    # Function to upsert the queued entities and close the database
+    def close(self):
+        self.sync()
+        self.db.close()
+
+# Function to open the journal of a JSON file, or the SQLite store next to it
+def outputStore(path):
+    return EntityStore(f'{os.path.splitext(path)[0]}.sqlite') if OUTPUT_SQLITE else Journal(path)
+
+# Persisted progress of a search: status of each person/place done (matched, skipped or no-match, the others being
+# pending) and cursor of the first pending one, appended when synced (after the journal entries of these)
+class Progress:
+    def __init__(self, path, journal):
+        self.path = path
+        self.journal = journal
+        self.file = None
+        self.lines = []
+        self.status = {}
+        self.cursor = 0
+        self.lastKey = None
+
+    # Function to replay the progress file
+    def load(self):
+        self.status = {}
+        self.cursor = 0
+        self.lastKey = None
+        try:
+            with open(self.path, 'rb+') as f:
+                end = 0
+                for line in f:
+                    # Stop at a line left incomplete by a crash, and cut it off so that new statuses start on a line
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        f.truncate(end)
+                        break
+                    self.status[entry['key']] = entry['status']
+                    self.cursor = entry['cursor']
+                    self.lastKey = entry['key']
+                    end += len(line)
+                    if not line.endswith(b'\n'):
+                        f.write(b'\n')
+        except FileNotFoundError:
+            pass
+
+    # Function to get the position of the first pending entity, or 0 to start a new pass once all are done
+    def resume(self, keys):
+        # Look for the first entity without status if the entities have changed since the cursor was saved
+        if self.cursor and (self.cursor > len(keys) or keys[self.cursor - 1] != self.lastKey):
+            self.cursor = next((i for i, key in enumerate(keys) if key not in self.status), len(keys))
+        if self.cursor >= len(keys):
+            self.reset()
+        return self.cursor
+
+    # Function to record the status of an entity and the position of the next one
+    def write(self, key, status, cursor):
+        self.lines.append(json.dumps({'key': key, 'status': status, 'cursor': cursor}) + '\n')
+        self.status[key] = status
+        self.cursor = cursor
+        self.lastKey = key
+        if len(self.lines) >= JOURNAL_SYNC_EVERY:
+            self.sync()
+
+    # Function to sync the journal and then append the recorded statuses to the progress file
+    def sync(self):
+        if self.journal:
+            self.journal.sync()
+        if self.lines:
+            if not self.file:
+                self.file = open(self.path, 'a')
+            self.file.writelines(self.lines)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.lines = []
+
+    # Function to count the entities of each status
+    def counts(self, keys):
+        counts = {'matched': 0, 'skipped': 0, 'no-match': 0, 'pending': 0}
+        for key in keys:
+            counts[self.status.get(key, 'pending')] += 1
+        return counts
+
+    # Function to forget all progress
+    def reset(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.status = {}
+        self.cursor = 0
+        self.lastKey = None
+
+    # Function to sync and close the progress file
+    def close(self):
+        self.sync()
+        if self.file:
+            self.file.close()
+            self.file = None
+
+# Function to sync the journals and the progress if the run is interrupted
+@atexit.register
+def syncJournals():
+    for journal in (peopleProgress, placesProgress, peopleJournal, placesJournal):
+        if journal:
+            journal.sync()
+
+# Function to ask user to confirm
+def askUser(qid, message=green('Confirm?')):
+    with metrics.timer('think'):
+        reply = input(f'\a   >>> {message} ')
+    print()
+
+    # Y to confirm
+    if qid and reply in ('y', 'Y'):
+        return qid
+
+    # S to skip to next person/place
+    elif reply in ('s', 'S'):
+        return 'BREAK'
+
+    # Manual insertion of Wikidata ID
+    elif reply.startswith('Q'):
+        return reply
+    return None
+
+def viafInteractive(name, wdEntities, extra=''):
+    extraString = f' • {extra}' if extra else ''
+    print(yellow(f'   {name}{extraString.title()}\n'))
+    printed = False
+
+    # For each entity that was found...
+    for entity in wdEntities:
+        printed = True
+
+        # Get the entity IRI
+        wdIRI = entity["item"]["value"]
+
+        if wdIRI in BANNED:
+            continue
+
+        # Get the Wikidata ID
+        qid = wdIRI.split('/')[-1]
+
+        # Get the entity label
+        label = entity["itemLabel"]["value"] if "itemLabel" in entity else None
+
+        # Get the entity description
+        desc = entity["itemDescription"]["value"] if "itemDescription" in entity else None
+
+        # Get the entity image
+        image = entity["image"]["value"] if "image" in entity else None
+        
+        # Get birth and death dates
+        birth = entity["birth"]["value"].split('T')[0] if "birth" in entity else None
+        death = entity["death"]["value"].split('T')[0] if "death" in entity else None
+
+        # Get gender
+        gender = entity["genderLabel"]["value"] if "genderLabel" in entity else None
+
+        # Print entity data
+        print(f'   {qid} • {label} • {desc}\n')
+
+        # Ask user to confirm
+        #try:
+        #    newQid = askUser(qid)
+        #except KeyboardInterrupt:
+        #    print('\n')
+        #    sys.exit()
+        
+        newQid = qid
+
+        # Return Wikidata IRI
+        if newQid:
+            if newQid == qid:
+                return (wdIRI, label, desc, image, birth, death, gender)
+            else:
+                label, desc, image, birth, death, gender, instanceOf, geo = getStatements(newQid)
+                if birth:
+                    birth = birth.split('T')[0]
+                if death:
+                    death = death.split('T')[0]
+                return (f'http://www.wikidata.org/entity/{newQid}', label, desc, image, birth, death, gender)
+            break
+
+    # Allow user to manually insert ID
+    if not printed:
+        print(f'   • No matches found\n')
+
+        try:
+            newQid = askUser(None, message=green('Insert ID:'))
+        except KeyboardInterrupt:
+            print('\n')
+            sys.exit()
+
+        # TODO: handle malformed IDs
+        if newQid:
+            label, desc, image, birth, death, gender, instanceOf, geo = getStatements(newQid)
+            if birth:
+                birth = birth.split('T')[0]
+            if death:
+                death = death.split('T')[0]
+            return (f'http://www.wikidata.org/entity/{newQid}', label, desc, image, birth, death, gender)
+
+    return (None, None, None, None, None, None, None)
+
+# Interactive Wikidata search
+def wikiInteractive(name, wdEntities, extra=''):
+    extraString = f' • {extra}' if extra else ''
+    print(yellow(f'   {name}{extraString.title()}\n'))
+    printed = False
+
+    # For each entity that was found...
+    for entity in wdEntities:
+        printed = True
+
+        # Get the entity IRI
+        wdIRI = entity["item"]["value"]
+
+        # Get the Wikidata ID
+        qid = wdIRI.split('/')[-1]
+
+        # Get the entity label
+        label = entity["itemLabel"]["value"] if "itemLabel" in entity else None
+
+        # Get the entity description
+        desc = entity["itemDescription"]["value"] if "itemDescription" in entity else None
+
+        # Get the entity image
+        image = entity["image"]["value"] if "image" in entity else None
+        
+        # Get birth and death dates
+        birth = entity["birth"]["value"] if "birth" in entity else None
+        death = entity["death"]["value"] if "death" in entity else None
+
+        # Get gender
+        gender = entity["genderLabel"]["value"] if "genderLabel" in entity else None
+
+        # Print entity data
+        print(f'   {qid} • {label} • {desc}\n')
+
+        # Ask user to confirm
+        try:
+            newQid = askUser(qid)
+        except KeyboardInterrupt:
+            print('\n')
+            sys.exit()
+
+        # Return Wikidata IRI
+        if newQid:
+            if newQid == qid:
+                return (wdIRI, label, desc, image, birth, death, gender)
+            else:
+                label, desc, image, birth, death, gender, instanceOf, geo = getStatements(newQid)
+                if birth:
+                    birth = birth.split('T')[0]
+                if death:
+                    death = death.split('T')[0]
+                return (f'http://www.wikidata.org/entity/{newQid}', label, desc, image, birth, death, gender)
+            break
+
+    # Allow user to manually insert ID
+    if not printed:
+        print(f'   • No matches found\n')
+
+        try:
+            newQid = askUser(None, message=green('Insert ID:'))
+        except KeyboardInterrupt:
+            print('\n')
+            sys.exit()
+
+        # TODO: handle malformed IDs
+        if newQid:
+            label, desc, image, birth, death, gender, instanceOf, geo = getStatements(newQid)
+            if birth:
+                birth = birth.split('T')[0]
+            if death:
+                death = death.split('T')[0]
+            return (f'http://www.wikidata.org/entity/{newQid}', label, desc, image, birth, death, gender)
+
+    return (None, None, None, None, None, None, None)
+
+# Function to read the CSV files, extract person/place names and create new JSON files
+def importCSV():
+    importStart = time.perf_counter()
+    people = {}
+    places = {}
+
+    print(pink('   === Import from CSV ==='))
+
+    # Read CSV file for people
+    with open(PEOPLE_IN) as f:
+        csv_people = csv.reader(f, delimiter=',', quotechar='"')
+
+        # For each row of the CSV...
+        for i, row in enumerate(csv_people):
+            if i > 0:
+                person = {}
+
+                # Split the person name
+                """
+                name_parts = row[0].split(',')
+                part_aliases = []
+                name_parts_new = []
+
+                # For each part of the name...
+                for part in name_parts:
+
+                    # Get the aliases - TODO: Fix the bugs!
+                    part_split = part.split('[')
+                    name_parts_new.append(part_split[0].strip())
+                    if len(part_split) > 1:
+                        part_aliases.append(part_split[0].strip(" []"))
+                if part_aliases:
+                    part_aliases.append(name_parts[-1].strip())
+                """
+
+                # Set the main name
+                #name = ', '.join(name_parts_new)
+                person['name'] = row[0]
+                person['viaf'] = row[1]
+                person['aliases'] = []
+
+                for alias in row[2].split(';'):
+                    if alias != person['name']:
+                        person['aliases'].append(alias)
+
+                # Look for more aliases
+                #try:
+                #    more_aliases = [x.strip(' <>') for x in row[1].split(';')]
+                #except:
+                #    print(row)
+
+                # Save the aliases
+                #person['Aliases'] = ([', '.join(part_aliases)] if part_aliases else []) + (more_aliases or [])
+
+                if person['name'] in people:
+                    print(f'   Duplicate: {person}')
+
+                # Add the person to the dictionary
+                people[row[0]] = EntityRecord(person)
+
+        # Save people to JSON (will overwrite!)
+        # TODO: merge JSON instead of overwriting
+        peopleJournal.compact(people)
+    
+    # Read CSV file for places
+    with open(PLACES_IN) as f:
+        csv_places = csv.reader(f, delimiter=',', quotechar='"')
+
+        # For each row of the CSV...
+        for i, row in enumerate(csv_places):
+            if i > 0:
+                place = {}
+
+                # Get the place title
+                #place = {}
+                #try:
+                #    title = row[2].split('(')[0]
+                #except:
+                #    print(row)
+
+                # Save the place title, aliases, and people
+                place['name'] = row[0]
+                place['lat'] = row[1]
+                place['lon'] = row[2]
+                place['viaf'] = row[3]
+                place['aliases'] = []
+            
+                for alias in row[4].split(';'):
+                    if alias != place['name']:
+                        place['aliases'].append(alias)
+            
+                #place['alias'] = [x.strip(' ()') for x in row[2].split('(')[1:]]
+                #place['person'] = name
+
+                # Fix the title to avoid duplicates
+                #fixed_title = f'{title} ({name})'
+
+                if place['name'] in places:
+                    print(f'   Duplicate: {place}')
+
+                # Add place to the dictionary
+                places[row[0]] = EntityRecord(place)
+
+                # Print and wait one second (for debug)
+                #print(f'person: {person["name"]}')
+                #print(f'Aliases: {person["alias"]}')
+                #print(f'place: {place["title"]}')
+                #print(f'Aliases: {place["alias"]}')
+                #print()
+                #time.sleep(1)
+
+        # Save places to JSON (will overwrite!)
+        # TODO: merge JSON instead of overwriting
+        placesJournal.compact(places)
+
+    print(f'   Imported people:   {len(people.keys())}')
+    print(f'   Imported places:   {len(places.keys())}')
+    metrics.observe('import', time.perf_counter() - importStart)
+    print()
+    return people, places
+
+# Function to compare the recall and latency of the name index with the Wikidata entity search
+def benchmarkNameIndex(people, places):
+    print(pink('   === Name Index Benchmark ===\n'))
+
+    # Index built without the matched entities, which are the ground truth, nor the cached responses of their names,
+    # VIAF IDs and Wikidata IDs
+    samples = {type: [(key, x) for key, x in entities.items() if x.get('iri')][:BENCHMARK_SAMPLE]
+               for entities, type in ((people, 'Q5'), (places, 'Q27096213'))}
+    index = buildNameIndex(heldOut=samples['Q5'] + samples['Q27096213'])
+    global nameIndex, responseCache
+
+    # Run the entity search without the cache, which holds the responses of the sample names
+    cache = responseCache
+    responseCache = None
+
+    for type, sample in samples.items():
+        if not sample:
+            continue
+
+        for path, searchIndex in (('Entity search', None), ('Name index', index)):
+            nameIndex = searchIndex
+            found = 0
+            latencies = []
+            for key, entity in sample:
+                start = time.perf_counter()
+                if searchIndex:
+                    qids = [qid for qid, score in searchIndex.search(key.split('(')[0].strip(), type)]
+                else:
+                    qids = [x['item']['value'].split('/')[-1] for x in wdQuery(key.split('(')[0].strip(), type)]
+                latencies.append(time.perf_counter() - start)
+                found += entity['iri'].split('/')[-1] in qids
+            latencies.sort()
+            print(f'   {type} • {path:<14} recall {100*found/len(sample):6.2f}% • '
+                  f'mean {1000*sum(latencies)/len(latencies):9.3f} ms • '
+                  f'p95 {1000*latencies[int(0.95*(len(latencies)-1))]:9.3f} ms')
+        print()
+    nameIndex = None
+    responseCache = cache
+
+# Function to compare the memory used by entity records and by dicts for synthetic matched people
+def benchmarkRecords(rows):
+    print(pink('   === Entity Record Benchmark ===\n'))
+
+    with open(PEOPLE_IN) as f:
+        sources = list(csv.reader(f, delimiter=',', quotechar='"'))[1:]
+
+    # Function to generate the matched people by repeating the input rows with numbered names
+    def synthetic():
+        for i in range(rows):
+            row = sources[i % len(sources)]
+            name = f'{row[0]} {i}'
+            yield name, {
+                'name': name,
+                'viaf': row[1],
+                'aliases': [x for x in row[2].split(';') if x != row[0]],
+                'iri': f'{WD_ENTITY}{1000000 + i}',
+                'desc': f'English physician {i % 100}',
+                'birth': f'{1600 + i % 150}-01-01',
+                'death': f'{1650 + i % 150}-01-01',
+                'gender': 'woman' if i % 4 == 0 else 'man',
+            }
+
+    # Check that the records are written to JSON as the dicts they are made from
+    sample = dict(synthetic()) if rows <= 1000 else dict(x for x, _ in zip(synthetic(), range(1000)))
+    if json.dumps({k: EntityRecord(v) for k, v in sample.items()}, default=EntityRecord.toDict) != json.dumps(sample):
+        print(red('   Records are not written to JSON as the dicts they are made from\n'))
+        return
+
+    results = {}
+    for path, make in (('Dicts', dict), ('Entity records', EntityRecord)):
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        entities = {name: make(entity) for name, entity in synthetic()}
+        elapsed = time.perf_counter() - start
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del entities
+        results[path] = size
+        print(f'   {path:<14} {size / 2**20:9.1f} MB • {size / rows:7.1f} bytes per person • built in {elapsed:6.2f} s')
+    print(f'\n   Entity records use {100 * (1 - results["Entity records"] / results["Dicts"]):.1f}% less memory than dicts\n')
+
+# Wikidata results for each VIAF ID, resolved in bulk before the search
+resolvedViafs = {}
+
+# Function to resolve the VIAF IDs of all entities without an IRI in chunks
+def resolveViafs(entities, type):
+    viafs = sorted(set(x['viaf'] for x in entities.values()
+                       if x.get('viaf') and not x.get('iri') and x['viaf'] not in resolvedViafs))
+    requests = 0
+
+    for i in range(0, len(viafs), VIAF_BATCH_SIZE):
+        resolvedViafs.update(wdViafBatchQuery(viafs[i:i + VIAF_BATCH_SIZE], type))
+        requests += 1
+
+    found = len([x for x in viafs if resolvedViafs[x]])
+    print(f'   Resolved {found} of {len(viafs)} VIAF IDs with {requests} queries\n')
+
+# Function to get all name variants to search for a person or place
+@metrics.timed
+def nameVariants(key, entity):
+    # Get name in titlecase
+    names = [(entity['name'] or key).title()]
+
+    # Get all aliases too
+    all_names = [x.title() for x in (names + [y.strip() for y in entity['aliases']]) if len(x) > 2]
+    final_names = all_names.copy()
+
+    # For each name...
+    for name in all_names:
+
+        # Split long names
+        split_name = name.split()
+        if len(split_name) > 2:
+            split_list = []
+            for split in split_name:
+                if len(split) < 4:
+                    split_list.append(split.lower())
+                else:
+                    split_list.append(split)
+            final_names.append(' '.join(split_list).strip())
+    return set(final_names)
+
+# Search query of each normalized name (the first name variant seen with that normalized form)
+plannedQueries = {}
+
+# Function to normalize a search query (case, spaces and surrounding punctuation do not change the results)
+def queryKey(name):
+    return ' '.join(name.split('(')[0].split()).strip('.,;: ').casefold()
+
+# Function to get the search query shared by all names equivalent to a name
+def plannedQuery(name):
+    return plannedQueries.setdefault(queryKey(name), name.split('(')[0].strip())
+
+# Function to get the Wikidata candidates for a name, running each distinct query once
+def searchCandidates(name, type):
+    return candidateFetcher.get(wdQuery, plannedQuery(name), type)
+
+# Function to plan the search queries of all entities without IRI, before any of them runs
+def planQueries(entities, type):
+    naive = 0
+    searches = set()
+    viafs = set()
+
+    for key, entity in entities.items():
+        if entity.get('iri') and entity['iri'] not in BANNED:
+            continue
+        variants = nameVariants(key, entity)
+
+        # Without planning, each name variant runs a search and a VIAF query
+        naive += len(variants) * (2 if entity.get('viaf') else 1)
+        searches.update(plannedQuery(name) for name in variants)
+        if entity.get('viaf'):
+            viafs.add(entity['viaf'])
+
+    viafBatches = -(-len(viafs) // VIAF_BATCH_SIZE)
+    searchBatches = -(-len(searches) // max(1, SEARCH_BATCH_SIZE)) if SEARCH_WORKERS else len(searches)
+    return naive, len(searches), searchBatches, viafBatches
+
+# Function to queue the queries for all name variants of some (key, entity) pairs, searching SEARCH_BATCH_SIZE names
+# with each query
+def prefetchCandidates(entities, type):
+    names = []
+    for key, entity in entities:
+        if entity['viaf'] and entity['viaf'] not in resolvedViafs:
+            candidateFetcher.submit(wdViafQuery, entity['viaf'], type)
+        names.extend(plannedQuery(name) for name in nameVariants(key, entity))
+    candidateFetcher.submitBatch(wdQuery, wdSearchBatchQuery, names, type, size=max(1, SEARCH_BATCH_SIZE))
+
+# Window of unresolved entities whose candidates are fetched while the current one is reviewed
+class LookAhead:
+    def __init__(self, entities, keys, type):
+        self.entities = entities
+        self.keys = keys
+        self.type = type
+        self.index = {key: i for i, key in enumerate(keys)}
+        self.position = 0
+
+    # Function to queue the candidates of an entity and of the next PREFETCH_AHEAD ones (and of a few more if
+    # needed to fill a batch of searches)
+    def advance(self, key):
+        if key not in self.index:
+            return
+        end = min(self.index[key] + 1 + PREFETCH_AHEAD, len(self.keys))
+        entities = []
+        names = 0
+        while self.position < len(self.keys) and (self.position < end or 0 < names < SEARCH_BATCH_SIZE):
+            nextKey = self.keys[self.position]
+            entities.append((nextKey, self.entities[nextKey]))
+            names += len(nameVariants(nextKey, self.entities[nextKey]))
+            self.position += 1
+        prefetchCandidates(entities, self.type)
+
+# Function to make a Wikidata query for people
+def make_person_query(name, viaf):
+    name = name.split('(')[0].strip()
+    wdIRI = None
+
+    if viaf:
+        viafEntities = resolvedViafs[viaf] if viaf in resolvedViafs else candidateFetcher.get(wdViafQuery, viaf, 'Q5')
+        (wdIRI, label, desc, image, birth, death, gender) = viafInteractive(name, viafEntities)
+
+    if not wdIRI:
+        wdEntities = searchCandidates(name, 'Q5')
+        (wdIRI, label, desc, image, birth, death, gender) = wikiInteractive(name, wdEntities)
+    return (wdIRI, label, desc, image, birth, death, gender)
+
+# Function to make a Wikidata query for places (with the nearest candidates first if the place has coordinates)
+def make_place_query(name, viaf, origin=None):
+    name = name.split('(')[0].strip()
+    wdIRI = None
+
+    if viaf:
+        viafEntities = resolvedViafs[viaf] if viaf in resolvedViafs else candidateFetcher.get(wdViafQuery, viaf, 'Q27096213')
+        (wdIRI, label, desc, image, birth, death, gender) = viafInteractive(name, viafEntities)
+
+    if not wdIRI:
+        wdEntities = rankByDistance(searchCandidates(name, 'Q27096213'), origin)
+        (wdIRI, label, desc, image, birth, death, gender) = wikiInteractive(name, wdEntities)
+    return (wdIRI, label, desc, image, birth, death, gender)
+
+# Function to save a Wikidata match to a person
+def applyPersonMatch(key, person, match):
+    wdIRI, label, desc, image, birth, death, gender = match
+    person['iri'] = wdIRI
+    person['desc'] = desc
+    person['image'] = image
+    person['name'] = key
+    person['birth'] = birth
+    person['death'] = death
+    person['gender'] = 'woman' if gender == 'female' else 'man' if gender == 'male' else gender
+
+    if 'img' in person:
+        del person['img']
+
+    if label != person['name']:
+        person['name'] = label
+        if key not in person['aliases']:
+            person['aliases'] = [key] + person['aliases']
+
+# Function to save a Wikidata match to a place
+def applyPlaceMatch(key, place, match):
+    wdIRI, label, desc, image, birth, death, gender = match
+    place['iri'] = wdIRI
+    place['desc'] = desc
+    place['image'] = image
+    place['name'] = key
+
+    if 'img' in place:
+        del place['img']
+
+    if label != place['name']:
+        place['name'] = label
+        if key not in place['aliases']:
+            place['aliases'] = [key] + place['aliases']
+
+# Fields of a Wikidata match, in the order make_person_query and make_place_query return them
+MATCH_FIELDS = ('iri', 'label', 'desc', 'image', 'birth', 'death', 'gender')
+
+# Function to get the fields of a Wikidata candidate, with dates without time
+def candidateMatch(entity):
+    return (entity["item"]["value"],
+            entity["itemLabel"]["value"] if "itemLabel" in entity else None,
+            entity["itemDescription"]["value"] if "itemDescription" in entity else None,
+            entity["image"]["value"] if "image" in entity else None,
+            entity["birth"]["value"].split('T')[0] if "birth" in entity else None,
+            entity["death"]["value"].split('T')[0] if "death" in entity else None,
+            entity["genderLabel"]["value"] if "genderLabel" in entity else None)
+
+# Function to get the distance in km between two points
+def geoDistance(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371 * math.asin(min(1, math.sqrt(a)))
+
+# Function to get the coordinates of a place, if it has valid ones
+def placeCoordinates(place):
+    try:
+        lat, lon = float(place.get('lat')), float(place.get('lon'))
+    except (TypeError, ValueError):
+        return None
+    return (lat, lon) if -90 <= lat <= 90 and -180 <= lon <= 180 else None
+
+# Function to get the coordinates of a Wikidata candidate, from its Point(lon lat) value
+def candidateCoordinates(entity):
+    if "geo" not in entity:
+        return None
+    try:
+        lon, lat = entity["geo"]["value"].split('(')[1].rstrip(')').split()[:2]
+        return float(lat), float(lon)
+    except (IndexError, ValueError):
+        return None
+
+# Function to sort candidates by their distance to a place, keeping the order of those without coordinates after them
+def rankByDistance(candidates, origin):
+    if not origin or not GEO_RANKING:
+        return candidates
+    distances = [(geoDistance(*origin, *point) if point else math.inf) for point in map(candidateCoordinates, candidates)]
+    return [candidate for distance, i, candidate in sorted(zip(distances, range(len(candidates)), candidates))]
+
+# Grid index of points by latitude and longitude, finding the points within a distance of a point
+class GeoIndex:
+    def __init__(self, cellSize):
+        self.degrees = max(cellSize, 1) / 111.32
+        self.columns = math.ceil(360 / self.degrees)
+        self.cells = {}
+
+    # Function to get the cell of a point
+    def cell(self, lat, lon):
+        return int((lat + 90) // self.degrees), int((lon + 180) // self.degrees) % self.columns
+
+    # Function to add a point
+    def add(self, key, lat, lon):
+        self.cells.setdefault(self.cell(lat, lon), []).append((key, lat, lon))
+
+    # Function to get the points within a distance (in km) of a point, the nearest first
+    def near(self, lat, lon, distance):
+        # Cells within the distance in latitude, and in longitude at the latitude nearest to a pole
+        row, column = self.cell(lat, lon)
+        rows = int(distance / 111.32 // self.degrees) + 1
+        polar = math.cos(math.radians(min(90, abs(lat) + distance / 111.32)))
+        columns = min(int(distance / (111.32 * polar) // self.degrees) + 1 if polar > 1e-6 else self.columns,
+                      self.columns // 2)
+        found = []
+        for i in range(row - rows, row + rows + 1):
+            for j in range(column - columns, column + columns + 1):
+                for key, otherLat, otherLon in self.cells.get((i, j % self.columns), []):
+                    d = geoDistance(lat, lon, otherLat, otherLon)
+                    if d <= distance:
+                        found.append((d, key))
+        return sorted(found)
+
+# Function to score a Wikidata candidate against the names of a person or place
+# (and against the coordinates of a place, if it has some)
+def scoreCandidate(names, entity, type, origin=None):
+    label = normalizeName(entity["itemLabel"]["value"]) if "itemLabel" in entity else ''
+    score = max(difflib.SequenceMatcher(None, normalizeName(name), label).ratio() for name in names)
+
+    if type == 'Q5':
+        # Never match people born after LATEST_BIRTH
+        birth = entity["birth"]["value"] if "birth" in entity else ''
+        if birth[0:4].isdigit() and int(birth[0:4]) > LATEST_BIRTH:
+            return 0
+
+        # Humans with neither gender nor birth date are less likely to be the right entity
+        if "genderLabel" not in entity and "birth" not in entity:
+            score *= 0.9
+
+    # Places far from the coordinates of the place are less likely to be the right entity
+    elif origin and GEO_RANKING:
+        point = candidateCoordinates(entity)
+        if point and geoDistance(*origin, *point) > GEO_RADIUS:
+            score *= 0.8
+    return score
+
+# Keys already queued for review
+reviewKeys = None
+reviewLock = threading.Lock()
+
+# Function to queue the candidates of a person or place for review
+def queueReview(key, type, names, ranked):
+    global reviewKeys
+    if not REVIEW_OUT:
+        return
+    candidates = []
+    for score, entity in ranked[:5]:
+        candidates.append(dict(zip(MATCH_FIELDS, candidateMatch(entity)), score=round(score, 3)))
+
+    with reviewLock:
+        if reviewKeys is None:
+            try:
+                with open(REVIEW_OUT) as f:
+                    reviewKeys = set((x['type'], x['key']) for x in map(json.loads, f))
+            except FileNotFoundError:
+                reviewKeys = set()
+        if (type, key) in reviewKeys:
+            return
+        reviewKeys.add((type, key))
+
+        with open(REVIEW_OUT, 'a') as f:
+            f.write(json.dumps({'type': type, 'key': key, 'names': names, 'candidates': candidates}) + '\n')
+
+# Function to match a person or place without asking, from its VIAF ID or its scored candidates
+def autoMatch(key, entity, type):
+    # Accept the first VIAF match, as viafInteractive does
+    if entity['viaf']:
+        viaf = entity['viaf']
+        viafEntities = resolvedViafs[viaf] if viaf in resolvedViafs else candidateFetcher.get(wdViafQuery, viaf, type)
+        for candidate in viafEntities:
+            if candidate["item"]["value"] not in BANNED:
+                metrics.add('autoMatched')
+                return candidateMatch(candidate)
+
+    # Score the candidates of all name variants (the nearest first for places with coordinates)
+    names = list(dict.fromkeys([key, entity['name'] or key] + entity['aliases']))
+    origin = placeCoordinates(entity) if type != 'Q5' else None
+    candidates = {}
+    for name in nameVariants(key, entity):
+        for candidate in rankByDistance(searchCandidates(name, type), origin):
+            wdIRI = candidate["item"]["value"]
+            if wdIRI not in BANNED and wdIRI not in candidates:
+                candidates[wdIRI] = (scoreCandidate(names, candidate, type, origin), candidate)
+    ranked = sorted(candidates.values(), key=lambda x: -x[0])
+
+    # Accept a clear best candidate
+    if ranked and ranked[0][0] >= AUTO_MATCH_THRESHOLD \
+            and (len(ranked) == 1 or ranked[0][0] - ranked[1][0] >= AUTO_MATCH_MARGIN):
+        match = candidateMatch(ranked[0][1])
+        print(f'   {yellow(key)} • {match[0].split("/")[-1]} • {match[1]} • {ranked[0][0]:.2f}')
+        metrics.add('autoMatched')
+        return match
+
+    # Queue the other cases for review
+    if ranked and ranked[0][0] > 0:
+        queueReview(key, type, names, ranked)
+        metrics.add('autoReview')
+    else:
+        metrics.add('autoNoMatch')
+    return (None, None, None, None, None, None, None)
+
+# Function to get the matches to try for a person or place, one name variant at a time
+def findMatches(key, entity, type):
+    if AUTO_MATCH:
+        yield autoMatch(key, entity, type)
+        return
+
+    for name in nameVariants(key, entity):
+        # Reverse names with comma
+        #if ',' in name:
+        #    try:
+        #        name = ' '.join(reversed(name.split(', ')))
+        #    except:
+        #        print(red(name.split(', ').reverse()))
+
+        # Make person or place query
+        if type == 'Q5':
+            yield make_person_query(name, entity['viaf'])
+        else:
+            yield make_place_query(name, entity['viaf'], placeCoordinates(entity))
+
+# Function to review the cases queued by an unattended run
+def reviewMatches(people, places):
+    print(pink('   === Review ===\n'))
+    print('   • Press ' + yellow('return') + ' to keep for later')
+    print('   • Insert a ' + yellow('number') + ' to choose a candidate')
+    print('   • Press ' + yellow('s') + ' to leave without match')
+    print('   • Insert a ' + yellow('Wikidata ID') + ' (e.g. Q1067) to add it manually\n')
+
+    try:
+        with open(REVIEW_OUT) as f:
+            entries = [json.loads(x) for x in f]
+    except FileNotFoundError:
+        entries = []
+    remaining = []
+
+    for i, entry in enumerate(entries):
+        if entry['type'] == 'Q5':
+            entities, journal, apply = people, peopleJournal, applyPersonMatch
+        else:
+            entities, journal, apply = places, placesJournal, applyPlaceMatch
+        key = entry['key']
+        entity = entities.get(key)
+        if not entity or entity.get('iri'):
+            continue
+
+        print(yellow(f'   {key} • {" • ".join(entry["names"][1:])}\n'))
+        for number, candidate in enumerate(entry['candidates'], 1):
+            print(f'   {number} • {candidate["iri"].split("/")[-1]} • {candidate["label"]} • '
+                  f'{candidate["desc"]} • {candidate["birth"]} • {candidate["score"]:.2f}')
+
+        try:
+            with metrics.timer('think'):
+                reply = input(f'\a\n   >>> {green("Choose:")} ').strip()
+        except KeyboardInterrupt:
+            remaining += entries[i:]
+            break
+        print()
+
+        if reply.isdigit() and 1 <= int(reply) <= len(entry['candidates']):
+            candidate = entry['candidates'][int(reply) - 1]
+            match = tuple(candidate[x] for x in MATCH_FIELDS)
+        elif reply.startswith('Q'):
+            label, desc, image, birth, death, gender, instanceOf, geo = getStatements(reply)
+            match = (f'http://www.wikidata.org/entity/{reply}', label, desc, image,
+                     birth.split('T')[0] if birth else None, death.split('T')[0] if death else None, gender)
+        elif reply in ('s', 'S'):
+            continue
+        else:
+            remaining.append(entry)
+            continue
+
+        apply(key, entity, match)
+        journal.write(key, entity)
+
+    # Keep the cases left for later
+    with open(REVIEW_OUT, 'w') as f:
+        for entry in remaining:
+            f.write(json.dumps(entry) + '\n')
+
+# Function to add the missing fields of a person
+def normalizeFields(key, entity):
+    missing = [x for x in ('iri', 'desc', 'image', 'gender', 'birth', 'death') if x not in entity]
+    for field in missing:
+        entity[field] = None
+    return bool(missing)
+
+# Function to sort the aliases of an entity, without duplicates and without its name
+# (each rule works on its own, with or without the fields the other rules add)
+def normalizeAliases(key, entity):
+    if 'aliases' not in entity:
+        return False
+    aliases = [x.strip() for x in sorted(set(entity['aliases']) - {entity.get('name')})]
+    if aliases == entity['aliases']:
+        return False
+    entity['aliases'] = aliases
+    return True
+
+# Function to clear the gender of a person without IRI, and use woman/man for the gender of the others
+def normalizeGender(key, entity):
+    gender = ({'female': 'woman', 'male': 'man'}.get(entity.get('gender'), entity.get('gender'))
+              if entity.get('iri') else None)
+    if 'gender' in entity and gender == entity['gender']:
+        return False
+    entity['gender'] = gender
+    return True
+
+# Function to guess the gender of a person without one from the honorifics in their names (the last name with one wins)
+def normalizeHonorifics(key, entity):
+    if entity.get('gender'):
+        return False
+    gender = None
+    for name in [key, entity.get('name') or key] + (entity.get('aliases') or []):
+        found = set(x.lastgroup for x in honorificPattern.finditer(name))
+        if found:
+            gender = 'man' if 'man' in found else 'woman'
+    if not gender:
+        return False
+    entity['gender'] = gender
+    return True
+
+# Function to unmatch a person born after LATEST_BIRTH
+def normalizeBirth(key, entity):
+    birth = entity.get('birth')
+    if not birth or not birth[0:4].isdigit() or int(birth[0:4]) <= LATEST_BIRTH:
+        return False
+    entity['name'] = key
+    for field in ('iri', 'desc', 'image', 'birth', 'death'):
+        entity[field] = None
+    return True
+
+# Function to use null for a missing VIAF ID
+def normalizeViaf(key, entity):
+    if entity.get('viaf') is None or entity['viaf']:
+        return False
+    entity['viaf'] = None
+    return True
+
+# Function to unmatch an entity matched to a banned IRI
+def normalizeBanned(key, entity):
+    if 'iri' not in entity or entity['iri'] not in BANNED:
+        return False
+    entity['iri'] = None
+    return True
+
+# Normalization rules by name (see PEOPLE_NORMALIZATION and PLACES_NORMALIZATION)
+normalizationRules = {
+    'fields': normalizeFields,
+    'aliases': normalizeAliases,
+    'gender': normalizeGender,
+    'honorifics': normalizeHonorifics,
+    'birth': normalizeBirth,
+    'viaf': normalizeViaf,
+    'banned': normalizeBanned,
+}
+
+# Matcher of male and female honorifics (compiled by configure)
+honorificPattern = None
+
+# Function to apply normalization rules to an entity, counting the changes of each rule, and return whether it changed
+def normalizeEntity(key, entity, rules, counts=None):
+    changed = False
+    for rule in rules:
+        if normalizationRules[rule](key, entity):
+            changed = True
+            if counts is not None:
+                counts[rule] += 1
+    return changed
+
+# Function to apply the normalization rules to all people or places in one pass, and return the number changed
+def normalizeEntities(entities, type):
+    rules = PEOPLE_NORMALIZATION if type == 'Q5' else PLACES_NORMALIZATION
+    counts = dict.fromkeys(rules, 0)
+    with metrics.timer('normalize'):
+        changed = sum(normalizeEntity(key, entity, rules, counts) for key, entity in entities.items())
+    if changed:
+        print(f'   Normalized {changed} of {len(entities)} {"people" if type == "Q5" else "places"} '
+              f'({", ".join(f"{rule}: {count}" for rule, count in counts.items())})\n')
+    return changed
+
+# Function to find the clusters of probable duplicates among people or places, and return the entity whose match
+# each duplicate gets (the first one of its cluster with a match, or else the first one)
+def clusterDuplicates(entities, type):
+    duplicates = {}
+    if not CLUSTER_DUPLICATES:
+        return duplicates
+
+    with metrics.timer('cluster'):
+        # Put the entities in blocks by VIAF ID and by the phonetic code of each token of their names
+        keys = {}
+        blocks = {}
+        for key, entity in entities.items():
+            keys[key] = set(filter(None, map(phoneticKey, [key, entity['name'] or key] + entity['aliases'])))
+            blocking = set(('code', code) for name in keys[key] for code in name.split())
+            if entity.get('viaf'):
+                blocking.add(('viaf', entity['viaf']))
+            for block in blocking:
+                blocks.setdefault(block, []).append(key)
+
+        # Function to get the first entity of the cluster of an entity
+        position = {key: i for i, key in enumerate(entities)}
+        parent = {}
+        viafs = {key: entity.get('viaf') for key, entity in entities.items()}
+        births = {key: str(entity.get('birth') or '')[:4] for key, entity in entities.items()}
+        origins = {key: placeCoordinates(entity) for key, entity in entities.items()}
+        def root(key):
+            while parent.get(key, key) != key:
+                key = parent[key]
+            return key
+
+        # Compare the entities of each block (except the largest ones, of common tokens) and join the duplicates
+        compared = set()
+        for (blockType, value), members in blocks.items():
+            if len(members) > CLUSTER_MAX_BLOCK and blockType != 'viaf':
+                continue
+            for i, key in enumerate(members):
+                for other in members[i + 1:]:
+                    if (key, other) in compared:
+                        continue
+                    compared.add((key, other))
+                    viaf, otherViaf = entities[key].get('viaf'), entities[other].get('viaf')
+                    gender, otherGender = entities[key].get('gender'), entities[other].get('gender')
+                    if viaf and otherViaf:
+                        duplicate = viaf == otherViaf
+                    elif gender and otherGender and gender != otherGender:
+                        duplicate = False
+                    elif births[key] and births[other] and births[key] != births[other]:
+                        duplicate = False
+                    elif origins[key] and origins[other] and geoDistance(*origins[key], *origins[other]) > GEO_RADIUS:
+                        duplicate = False
+                    else:
+                        duplicate = any(similarKeys(x, y) for x in keys[key] for y in keys[other])
+
+                    # Never join clusters with different VIAF IDs
+                    if duplicate:
+                        first, second = sorted((root(key), root(other)), key=position.get)
+                        if first != second and not (viafs[first] and viafs[second] and viafs[first] != viafs[second]):
+                            parent[second] = first
+                            viafs[first] = viafs[first] or viafs[second]
+
+        clusters = {}
+        for key in parent:
+            clusters.setdefault(root(key), [root(key)]).append(key)
+        saved = 0
+        for first, members in clusters.items():
+            members.sort(key=position.get)
+            matched = next((x for x in members if entities[x].get('iri') and entities[x]['iri'] not in BANNED), first)
+            for key in members:
+                if key != matched:
+                    duplicates[key] = matched
+                    if not entities[key].get('iri'):
+                        saved += len(set(map(queryKey, nameVariants(key, entities[key])))
+                                     - set(map(queryKey, nameVariants(matched, entities[matched]))))
+
+    if clusters:
+        print(f'   Found {len(clusters)} clusters of probable duplicate {"people" if type == "Q5" else "places"} '
+              f'({len(duplicates)} duplicates, {len(compared)} comparisons in {len(blocks)} blocks), '
+              f'saving up to {saved} searches\n')
+    return duplicates
+
+# Function to give an entity without IRI the match of the entity it probably duplicates, if that one has a match
+# (returns whether it was given)
+def shareMatch(key, entity, primary, type):
+    if not primary or not primary.get('iri') or primary['iri'] in BANNED:
+        return False
+    print(f'   {yellow(key)} • {primary["iri"].split("/")[-1]} • {primary["name"]} • probable duplicate')
+    saved = len(set(map(queryKey, nameVariants(key, entity)))
+                - set(map(queryKey, nameVariants(primary['name'], primary))))
+    match = (primary['iri'], primary['name'], primary.get('desc'), primary.get('image'))
+    if type == 'Q5':
+        applyPersonMatch(key, entity, match + (primary.get('birth'), primary.get('death'), primary.get('gender')))
+    else:
+        applyPlaceMatch(key, entity, match + (None, None, None))
+    metrics.add('duplicatesShared')
+    metrics.add('searchesSaved', saved)
+    return True
+
+# Function to clean up a person, update it from its statements and match it if it has no IRI
+# (returns whether the person was changed, and its status)
+def processPerson(key, person, birthCountries, statements, lookAhead=None, primary=None):
+    changed = False
+
+    if person.get('iri'):
+        isGlobalMajority = birthCountries.get(person['iri'].split('/')[-1])
+
+        if isGlobalMajority:
+            print(f'   {yellow(person["iri"].split("/")[-1])} • {yellow(person["name"])}')
+            print(f'   {isGlobalMajority}\n')
+
+    if UPDATE_ALL and person.get('iri'):
+        label, desc, image, birth, death, gender, instanceOf, geo = statements[person['iri'].split('/')[-1]]
+
+        person['desc'] = desc
+        person['image'] = image
+        person['name'] = key
+        person['birth'] = birth.split('T')[0] if birth else None
+        person['death'] = death.split('T')[0] if death else None
+        person['gender'] = 'woman' if gender == 'female' else 'man' if gender == 'male' else gender
+
+        if 'img' in person:
+            del person['img']
+
+        if label != person['name']:
+            person['name'] = label
+            if key not in person['aliases']:
+                person['aliases'] = [key] + person['aliases']
+
+        # Normalize the gender and birth refreshed from Wikidata
+        normalizeEntity(key, person, [x for x in PEOPLE_NORMALIZATION if x in ('gender', 'honorifics', 'birth')])
+        changed = True
+
+    # Leave people without IRI alone unless they are matched
+    status = 'matched'
+    if not person.get('iri') and not (AUTO_MATCH or MATCH_PEOPLE):
+        status = 'skipped'
+
+    # If person has no IRI...
+    elif not person.get('iri'):
+
+        # Get person name in titlecase
+        if not person['name']:
+            person['name'] = key.title()
+
+        # Match a probable duplicate with the first person of its cluster, if that one has a match
+        if shareMatch(key, person, primary, 'Q5'):
+            return True, status
+
+        # Fetch candidates of the next people while this one is reviewed
+        if lookAhead:
+            lookAhead.advance(key)
+
+        # For each match to try...
+        status = 'no-match'
+        for wdIRI, label, desc, image, birth, death, gender in findMatches(key, person, 'Q5'):
+
+            if wdIRI:
+                if 'BREAK' in wdIRI:
+                    status = 'skipped'
+                    break
+                applyPersonMatch(key, person, (wdIRI, label, desc, image, birth, death, gender))
+                changed = True
+                status = 'matched'
+                break
+
+        # People queued for review by an unattended run are skipped until then
+        if status == 'no-match' and reviewKeys and ('Q5', key) in reviewKeys:
+            status = 'skipped'
+    return changed, status
+
+# Function to clean up a place, update it from its statements and match it if it has no IRI
+# (returns whether the place was changed, and its status)
+def processPlace(key, place, statements, lookAhead=None, primary=None):
+    changed = False
+
+    # If place has no IRI...
+    status = 'matched'
+    if 'iri' not in place or not place['iri']:
+
+        # Match a probable duplicate with the first place of its cluster (or near it), if that one has a match
+        if shareMatch(key, place, primary, 'Q27096213'):
+            return True, status
+
+        # Fetch candidates of the next places while this one is reviewed
+        if lookAhead:
+            lookAhead.advance(key)
+
+        # For each match to try...
+        status = 'no-match'
+        for wdIRI, label, desc, image, birth, death, gender in findMatches(key, place, 'Q27096213'):
+
+            if wdIRI:
+                if 'BREAK' in wdIRI:
+                    status = 'skipped'
+                    break
+                applyPlaceMatch(key, place, (wdIRI, label, desc, image, birth, death, gender))
+                changed = True
+                status = 'matched'
+                break
+
+        # Places queued for review by an unattended run are skipped until then
+        if status == 'no-match' and reviewKeys and ('Q27096213', key) in reviewKeys:
+            status = 'skipped'
+
+    # (places matched to a banned IRI are kept as they are when the banned rule is off)
+    elif UPDATE_ALL and place['iri'] not in BANNED:
+        label, desc, image, birth, death, gender, instanceOf, geo = statements[place['iri'].split('/')[-1]]
+
+        print(f'   {yellow(label)}')
+        print(f'   {instanceOf}\n')
+
+        place['desc'] = desc
+        place['image'] = image
+        place['name'] = key
+
+        if geo:
+            place['lat'] = geo.split('(')[1].split(' ')[1].strip(')')
+            place['lon'] = geo.split('(')[1].split(' ')[0]
+
+        if 'img' in place:
+            del place['img']
+
+        if label != place['name']:
+            place['name'] = label
+            if key not in place['aliases']:
+                place['aliases'] = [key] + place['aliases']
+
+        changed = True
+    return changed, status
+
+# Function to get the entities left to search, from the first pending one if the progress is kept
+def pendingEntities(entities, progress):
+    if not progress:
+        return entities
+    keys = list(entities)
+    return {key: entities[key] for key in keys[progress.resume(keys):]}
+
+# Function to search Wikidata for people, writing the changed ones to the journal and their status to the progress
+def searchPeople(people, journal=None, progress=None):
+    # Normalize all people, writing them once if any changed
+    if normalizeEntities(people, 'Q5') and journal:
+        journal.compact(people)
+
+    pending = pendingEntities(people, progress)
+    cursor = len(people) - len(pending)
+    if cursor:
+        print(f'   Resuming from {next(iter(pending))} ({cursor} of {len(people)} done)\n')
+
+    # Resolve all VIAF IDs before searching names
+    if AUTO_MATCH or MATCH_PEOPLE:
+        resolveViafs(pending, 'Q5')
+
+    # Get birth countries (and all statements if updating) in bulk
+    peopleQids = [x['iri'].split('/')[-1] for x in pending.values() if x.get('iri')]
+    birthCountries = batchByQid(getBirthCountryBatch, peopleQids)
+    peopleStatements = batchByQid(getStatementsBatch, peopleQids) if UPDATE_ALL else {}
+
+    # Find the clusters of probable duplicates
+    duplicates = clusterDuplicates(people, 'Q5')
+
+    # Fetch candidates of the next people without IRI (except probable duplicates) in the background
+    lookAhead = LookAhead(pending, [key for key, x in pending.items() if not x.get('iri') and key not in duplicates
+                                    and (AUTO_MATCH or MATCH_PEOPLE)], 'Q5')
+
+    # For each person...
+    for key, person in pending.items():
+        changed, status = processPerson(key, person, birthCountries, peopleStatements, lookAhead,
+                                        people.get(duplicates.get(key)))
+        if changed and journal:
+            journal.write(key, person)
+        cursor += 1
+        if progress:
+            progress.write(key, status, cursor)
+
+# Function to get the similarity of the names and aliases of two entities
+def nameSimilarity(entity, other):
+    names = set(normalizeName(x) for x in [entity['name']] + entity['aliases'])
+    otherNames = set(normalizeName(x) for x in [other['name']] + other['aliases'])
+    return max(difflib.SequenceMatcher(None, x, y).ratio() for x in names for y in otherNames)
+
+# Function to flag the places within GEO_DUPLICATE_DISTANCE km of an earlier place with a similar name,
+# and return the earliest place of each one
+def geoDuplicates(places):
+    duplicates = {}
+    if not GEO_DUPLICATE_DISTANCE:
+        return duplicates
+
+    index = GeoIndex(GEO_DUPLICATE_DISTANCE)
+    with metrics.timer('geo'):
+        for key, place in places.items():
+            origin = placeCoordinates(place)
+            if not origin:
+                continue
+            for distance, other in index.near(*origin, GEO_DUPLICATE_DISTANCE):
+                if nameSimilarity(place, places[other]) >= GEO_DUPLICATE_SIMILARITY:
+                    duplicates[key] = duplicates.get(other, other)
+                    break
+            index.add(key, *origin)
+    if duplicates:
+        print(f'   Flagged {len(duplicates)} places within {GEO_DUPLICATE_DISTANCE} km of an earlier place '
+              f'with a similar name\n')
+    return duplicates
+
+# Function to search Wikidata for places, writing the changed ones to the journal and their status to the progress
+def searchPlaces(places, journal=None, progress=None):
+    # Normalize all places, writing them once if any changed
+    if normalizeEntities(places, 'Q27096213') and journal:
+        journal.compact(places)
+
+    pending = pendingEntities(places, progress)
+    cursor = len(places) - len(pending)
+    if cursor:
+        print(f'   Resuming from {next(iter(pending))} ({cursor} of {len(places)} done)\n')
+
+    # Resolve all VIAF IDs before searching names
+    resolveViafs(pending, 'Q27096213')
+
+    # Get all statements in bulk if updating
+    placeQids = [x['iri'].split('/')[-1] for x in pending.values() if x.get('iri') and x['iri'] not in BANNED]
+    placeStatements = batchByQid(getStatementsBatch, placeQids) if UPDATE_ALL else {}
+
+    # Find the clusters of probable duplicates and the places near an earlier place with a similar name
+    duplicates = clusterDuplicates(places, 'Q27096213')
+    for key, primary in geoDuplicates(places).items():
+        duplicates.setdefault(key, duplicates.get(primary, primary))
+    duplicates = {key: primary for key, primary in duplicates.items() if key != primary}
+
+    # Fetch candidates of the next places without IRI (except probable duplicates) in the background
+    lookAhead = LookAhead(pending, [key for key, x in pending.items()
+                                    if (not x.get('iri') or x['iri'] in BANNED) and key not in duplicates], 'Q27096213')
+
+    # For each place...
+    for key, place in pending.items():
+        changed, status = processPlace(key, place, placeStatements, lookAhead, places.get(duplicates.get(key)))
+        if changed and journal:
+            journal.write(key, place)
+        cursor += 1
+        if progress:
+            progress.write(key, status, cursor)
+
+# Function to report the benchmark, after refreshing all matched entities as an UPDATE_ALL run does
+def reportBenchmark(people, places, start):
+    for entities in (people, places):
+        qids = [x['iri'].split('/')[-1] for x in entities.values() if x.get('iri')]
+        batchByQid(getStatementsBatch, qids)
+        if entities is people:
+            batchByQid(getBirthCountryBatch, qids)
+    benchmarkTime = time.perf_counter() - start
+
+    print(pink('   === Benchmark ===\n'))
+    entityCount = len(people) + len(places)
+    print(f'   Stub endpoint:   {1000*STUB_LATENCY:.0f} ms latency, {100*STUB_ERROR_RATE:.1f}% errors')
+    print(f'   Rate limit:      {f"{MAX_REQUESTS_PER_SECOND:g} requests/s" if MAX_REQUESTS_PER_SECOND else "none"}, '
+          f'{MAX_IN_FLIGHT} requests in flight')
+    print(f'   {entityCount} entities in {benchmarkTime:.1f} s ({entityCount/benchmarkTime:.1f} entities/s)')
+    print(f'   {metrics.counters.get("requests", 0)} requests ({metrics.counters.get("requests", 0)/(entityCount or 1):.2f} per entity), '
+          f'p50 {1000*metrics.percentile("request", 0.5):.1f} ms, p95 {1000*metrics.percentile("request", 0.95):.1f} ms, '
+          f'{metrics.counters.get("bytes", 0)/1024/1024:.2f} MB transferred')
+    print(f'   Outputs in {BENCHMARK_PATH}\n')
+
+# Function to print the statistics of people and places, and of the queries of the run
+def printStatistics(people, places):
+    print(pink('   === Statistics ==='))
+
+    # Print person statistics
+    wikiPeople = [x for x in people.values() if 'iri' in x and x['iri']]
+    personPercent = len(wikiPeople)/(len(people.values()) or 1)
+    print(f'   {len(wikiPeople)} of {len(people.values())} people ({100*personPercent:.2f}%) have a Wikidata IRI')
+
+    # Print gender statistics
+    genderPeople = [x for x in people.values() if 'gender' in x and x['gender']]
+    genderPercent = len(genderPeople)/(len(people.values()) or 1)
+    print(f'   {len(genderPeople)} of {len(people.values())} people ({100*genderPercent:.2f}%) have a gender\n')
+
+    # Print place statistics
+    wikiPlaces = [x for x in places.values() if 'iri' in x and x['iri']]
+    placePercent = len(wikiPlaces)/(len(places.values()) or 1)
+    print(f'   {len(wikiPlaces)} of {len(places.values())} places ({100*placePercent:.2f}%) have a Wikidata IRI')
+
+    # Print geographic coordinate statistics
+    geoPlaces = [x for x in places.values() if 'lat' in x and x['lat']]
+    placePercent = len(geoPlaces)/(len(places.values()) or 1)
+    print(f'   {len(geoPlaces)} of {len(places.values())} places ({100*placePercent:.2f}%) have geographic coordinates\n')
+
+    # Print search progress statistics
+    for name, entities, progress in (('People', people, peopleProgress), ('Places', places, placesProgress)):
+        if progress and progress.status:
+            counts = progress.counts(entities)
+            print(f'   {name}:   {counts["matched"]} matched, {counts["skipped"]} skipped, '
+                  f'{counts["no-match"]} without match and {counts["pending"]} pending')
+    if (peopleProgress and peopleProgress.status) or (placesProgress and placesProgress.status):
+        print()
+
+    # Print unattended matching statistics
+    if AUTO_MATCH:
+        print(f'   {metrics.counters.get("autoMatched", 0)} matched automatically, {metrics.counters.get("autoReview", 0)} queued for review '
+              f'and {metrics.counters.get("autoNoMatch", 0)} without candidates\n')
+
+    # Print duplicate statistics
+    if metrics.counters.get('duplicatesShared'):
+        print(f'   {metrics.counters["duplicatesShared"]} probable duplicates were given the match of their cluster, '
+              f'saving {metrics.counters.get("searchesSaved", 0)} searches\n')
+
+    # Print search batch statistics
+    if metrics.counters.get('searchBatches') or metrics.counters.get('searchBatchFallbacks'):
+        print(f'   {metrics.counters.get("searchBatches", 0)} queries searched several names at once, and '
+              f'{metrics.counters.get("searchBatchFallbacks", 0)} that failed were searched name by name\n')
+
+    # Print cache statistics
+    cacheHits = metrics.counters.get('cacheHits', 0)
+    cacheQueries = cacheHits + metrics.counters.get('cacheMisses', 0)
+    cachePercent = cacheHits/(cacheQueries or 1)
+    print(f'   {cacheHits} of {cacheQueries} queries ({100*cachePercent:.2f}%) were answered from the cache')
+    print(f'   {metrics.counters.get("cacheEvictions", 0)} cached responses were evicted')
+
+    # Print connection statistics
+    opened = metrics.counters.get('connectionsOpened', 0)
+    reused = metrics.counters.get('connectionsReused', 0)
+    print(f'   {opened} connections were opened and {reused} were reused')
+
+    # Print retry statistics
+    print(f'   {metrics.counters.get("retries", 0)} requests were retried ({metrics.counters.get("throttled", 0)} throttled, '
+          f'{metrics.counters.get("serverErrors", 0)} server errors, {metrics.counters.get("networkErrors", 0)} network errors)')
+    finalRate = f'{rateLimiter.rate:.1f}/s' if rateLimiter.rate else 'unlimited'
+    print(f'   Request rate was lowered {metrics.counters.get("rateDecreases", 0)} times and ended at {finalRate}\n')
+
+# Temporary directory of the benchmark and cache replayed by its stub endpoint (set by setupBenchmark)
+BENCHMARK_PATH = RECORDINGS_PATH = None
+
+# Function to report the benchmark, the statistics and the time spent in each phase
+def report(people, places, start):
+    if BENCHMARK:
+        reportBenchmark(people, places, start)
+
+    printStatistics(people, places)
+
+    # Print the time spent in each phase
+    print(pink('   === Timing ===\n'))
+    metrics.report()
+
+    # Write the metrics
+    if METRICS_OUT:
+        metrics.write(METRICS_OUT)
+
+# Function to get the shard of a person or place, from a hash of its key that is the same in every process
+def shardOf(key):
+    return zlib.crc32(key.encode('utf-8')) % SHARDS
+
+# Function to split a CSV file into one CSV file per shard, and return its keys in order
+def splitCSV(source, paths):
+    with open(source) as f:
+        rows = list(csv.reader(f, delimiter=',', quotechar='"'))
+    files = [open(path, 'w') for path in paths]
+    writers = [csv.writer(f) for f in files]
+    for writer in writers:
+        writer.writerow(rows[0])
+    for row in rows[1:]:
+        writers[shardOf(row[0])].writerow(row)
+    for f in files:
+        f.close()
+    return list(dict.fromkeys(row[0] for row in rows[1:]))
+
+# Function to split entities into one JSON file (or SQLite store) per shard, and return their keys in order
+def splitEntities(entities, paths):
+    shards = [{} for path in paths]
+    for key, entity in entities.items():
+        shards[shardOf(key)][key] = entity
+    for shard, path in zip(shards, paths):
+        store = outputStore(path)
+        store.compact(shard)
+        store.close()
+    return list(entities)
+
+# Function to merge the JSON files (or SQLite stores) of the shards in the order of the keys
+# (the rows of a key are all in one shard, whose import reports its duplicates)
+def mergeShards(keys, paths):
+    entities = {}
+    for path in paths:
+        store = outputStore(path)
+        entities.update(store.load())
+        store.close()
+    merged = {key: entities.pop(key) for key in keys if key in entities}
+    merged.update(entities)
+    return merged
+
+# Function to run a shard in a worker process, printing to its log file, and return its metrics
+def runShard(options, logPath):
+    with open(logPath, 'w') as log, contextlib.redirect_stdout(log):
+        configure(**options)
+        run()
+        shutdown()
+    return metrics.counters, metrics.histograms
+
+# Function to run the benchmark with a lookup engine in a worker process, printing to its log file, and return
+# its number of entities, wall-clock time and metrics
+def runEngineBenchmark(options, logPath):
+    with open(logPath, 'w') as log, contextlib.redirect_stdout(log):
+        configure(**options)
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        entities = len(peopleJournal.load()) + len(placesJournal.load())
+        shutdown()
+    return entities, elapsed, metrics.counters, metrics.histograms
+
+# Function to compare the lookup engines by running the benchmark with each of them against the stub endpoint
+def benchmarkEngines():
+    print(pink('   === Lookup Engine Benchmark ===\n'))
+    logPath = tempfile.mkdtemp(prefix='sloane-engines-')
+    options = {name: value for name, value in globals().items() if name.isupper()}
+    options.update(BENCHMARK=True, BENCHMARK_ENGINES=False, SHARDS=1, SERVE=False, METRICS_OUT=None)
+
+    for engine in ('sparql', 'action'):
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            entities, elapsed, counters, histograms = pool.submit(runEngineBenchmark, dict(options, LOOKUP_ENGINE=engine),
+                                                                  f'{logPath}/{engine}.log').result()
+        engineMetrics = Metrics()
+        engineMetrics.merge(counters, histograms)
+        entities = entities or 1
+        print(f'   {engine:<8} {1000*elapsed/entities:8.1f} ms per entity • '
+              f'{counters.get("requests", 0)/entities:6.2f} requests per entity • '
+              f'request p50 {1000*engineMetrics.percentile("request", 0.5):6.1f} ms, '
+              f'p95 {1000*engineMetrics.percentile("request", 0.95):6.1f} ms • '
+              f'{counters.get("bytes", 0)/entities/1024:6.2f} KB per entity')
+    print(f'\n   Logs in {logPath}\n')
+
+# Function to search the shards of the people and places in worker processes and merge their outputs
+def runShards():
+    start = time.perf_counter()
+    print()
+    print(pink('   === Shards ===\n'))
+
+    os.makedirs(SHARDS_PATH, exist_ok=True)
+    paths = [{name: f'{SHARDS_PATH}/{i}-{os.path.basename(globals()[name])}'
+              for name in ('PEOPLE_IN', 'PLACES_IN', 'PEOPLE_OUT', 'PLACES_OUT', 'REVIEW_OUT')} for i in range(SHARDS)]
+    for shardPaths in paths:
+        if os.path.exists(shardPaths['REVIEW_OUT']):
+            os.remove(shardPaths['REVIEW_OUT'])
+
+    # Split the input CSVs, or the JSON files when searching them again
+    if IMPORT_FROM_CSV:
+        peopleKeys = splitCSV(PEOPLE_IN, [x['PEOPLE_IN'] for x in paths])
+        placeKeys = splitCSV(PLACES_IN, [x['PLACES_IN'] for x in paths])
+    else:
+        peopleKeys = splitEntities(peopleJournal.load(), [x['PEOPLE_OUT'] for x in paths])
+        placeKeys = splitEntities(placesJournal.load(), [x['PLACES_OUT'] for x in paths])
+
+    # Run the shards unattended, sharing the request rate and the simultaneous requests
+    options = {name: value for name, value in globals().items() if name.isupper()}
+    options.update(SHARDS=1, AUTO_MATCH=True, RESUME=False, BENCHMARK=False, REVIEW_MATCHES=False, DRY_RUN=False, SERVE=False,
+                   METRICS_OUT=None, MAX_REQUESTS_PER_SECOND=MAX_REQUESTS_PER_SECOND / SHARDS,
+                   MAX_IN_FLIGHT=max(1, MAX_IN_FLIGHT // SHARDS))
+    with ProcessPoolExecutor(SHARDS, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = [pool.submit(runShard, dict(options, **paths[i]), f'{SHARDS_PATH}/{i}.log') for i in range(SHARDS)]
+        for i, future in enumerate(futures):
+            metrics.merge(*future.result())
+            print(f'   Shard {i} done (log in {SHARDS_PATH}/{i}.log)')
+    print()
+
+    # Merge the outputs of the shards
+    people = mergeShards(peopleKeys, [x['PEOPLE_OUT'] for x in paths])
+    places = mergeShards(placeKeys, [x['PLACES_OUT'] for x in paths])
+    peopleJournal.compact(people)
+    placesJournal.compact(places)
+
+    # Add the cases queued for review by the shards to the review queue
+    try:
+        with open(REVIEW_OUT) as f:
+            queued = set((x['type'], x['key']) for x in map(json.loads, f))
+    except FileNotFoundError:
+        queued = set()
+    with open(REVIEW_OUT, 'a') as out:
+        for shardPaths in paths:
+            if os.path.exists(shardPaths['REVIEW_OUT']):
+                with open(shardPaths['REVIEW_OUT']) as f:
+                    for entry in map(json.loads, f):
+                        if (entry['type'], entry['key']) not in queued:
+                            queued.add((entry['type'], entry['key']))
+                            out.write(json.dumps(entry) + '\n')
+
+    report(people, places, start)
+
+# Function to set up the benchmark: import copies of the input CSVs in a temporary directory, search them
+# unattended, and send every query to the stub endpoint (which replays the cache instead of the matcher)
+def setupBenchmark():
+    global BENCHMARK_PATH, RECORDINGS_PATH, CACHE_ENABLED, CACHE_OFFLINE, IMPORT_FROM_CSV, SEARCH_WD_PEOPLE, \
+        SEARCH_WD_PLACES, AUTO_MATCH, UPDATE_ALL, REVIEW_MATCHES, DRY_RUN, BUILD_LOCAL_INDEX, BENCHMARK_NAME_INDEX, \
+        USE_LOCAL_INDEX, USE_NAME_INDEX, RESUME, PEOPLE_IN, PLACES_IN, PEOPLE_OUT, PLACES_OUT, REVIEW_OUT, WD_URL, \
+        ACTION_API_URL, SHARDS_PATH, MAX_REQUESTS_PER_SECOND, MAX_IN_FLIGHT
+
+    BENCHMARK_PATH = tempfile.mkdtemp(prefix='sloane-benchmark-')
+    RECORDINGS_PATH = CACHE_PATH
+    CACHE_ENABLED = CACHE_OFFLINE = False
+    IMPORT_FROM_CSV = SEARCH_WD_PEOPLE = SEARCH_WD_PLACES = AUTO_MATCH = True
+    UPDATE_ALL = REVIEW_MATCHES = DRY_RUN = BUILD_LOCAL_INDEX = BENCHMARK_NAME_INDEX = False
+    USE_LOCAL_INDEX = USE_NAME_INDEX = False
+    RESUME = False
+    PEOPLE_OUT = f'{BENCHMARK_PATH}/sloane_people.json'
+    PLACES_OUT = f'{BENCHMARK_PATH}/sloane_places.json'
+    REVIEW_OUT = f'{BENCHMARK_PATH}/sloane_review.jsonl'
+    SHARDS_PATH = f'{BENCHMARK_PATH}/shards'
+    MAX_REQUESTS_PER_SECOND = BENCHMARK_RATE
+    MAX_IN_FLIGHT = BENCHMARK_IN_FLIGHT
+
+    # Generate rows by repeating the input rows with numbered names and without VIAF IDs
+    if BENCHMARK_ROWS:
+        for source, viafColumn in ((PEOPLE_IN, 1), (PLACES_IN, 3)):
+            with open(source) as f:
+                rows = list(csv.reader(f, delimiter=',', quotechar='"'))
+            with open(f'{BENCHMARK_PATH}/{os.path.basename(source)}', 'w') as f:
+                writer = csv.writer(f)
+                writer.writerow(rows[0])
+                for i in range(BENCHMARK_ROWS):
+                    row = rows[1:][i % (len(rows) - 1)].copy()
+                    if i >= len(rows) - 1:
+                        row[0] = f'{row[0]} {i // (len(rows) - 1)}'
+                        row[viafColumn] = ''
+                    writer.writerow(row)
+        PEOPLE_IN = f'{BENCHMARK_PATH}/{os.path.basename(PEOPLE_IN)}'
+        PLACES_IN = f'{BENCHMARK_PATH}/{os.path.basename(PLACES_IN)}'
+
+    # Start the stub endpoint
+    stubURL = StubEndpoint.start(RECORDINGS_PATH)
+    WD_URL = f'{stubURL}/sparql?query='
+    ACTION_API_URL = f'{stubURL}/w/api.php'
+
+# Function to close the objects shared by all matches
+def shutdown():
+    for shared in (responseCache, candidateFetcher, localIndex, peopleProgress, placesProgress, peopleJournal, placesJournal):
+        if shared:
+            shared.close()
+
+# Paths under the base path, rebuilt by configure when it is given without them
+basePaths = {'PEOPLE_IN': 'sloane_people.csv', 'PLACES_IN': 'sloane_places.csv', 'PEOPLE_OUT': 'sloane_people.json',
+             'PLACES_OUT': 'sloane_places.json', 'WIKIDATA_DUMP': 'latest-all.json.gz',
+             'LOCAL_INDEX_PATH': 'wikidata_local.sqlite', 'REVIEW_OUT': 'sloane_review.jsonl', 'SHARDS_PATH': 'shards',
+             'CACHE_PATH': 'sloane_cache.sqlite'}
+
+# Function to set options (by the name of their constant) and create the objects shared by all matches
+def configure(**options):
+    global responseCache, connectionPool, rateLimiter, candidateFetcher, localIndex, lookupEngine, peopleJournal, \
+        placesJournal, peopleProgress, placesProgress, reviewKeys, honorificPattern
+
+    for name, value in options.items():
+        if not name.isupper() or name not in globals():
+            raise ValueError(f'Unknown option: {name}')
+        globals()[name] = value
+    if 'BASE_PATH' in options:
+        for name, path in basePaths.items():
+            if name not in options:
+                globals()[name] = f'{BASE_PATH}/{path}'
+
+    for rule in PEOPLE_NORMALIZATION + PLACES_NORMALIZATION:
+        if rule not in normalizationRules:
+            raise ValueError(f'Unknown normalization rule: {rule}')
+    if LOOKUP_ENGINE not in ('sparql', 'action'):
+        raise ValueError(f'Unknown lookup engine: {LOOKUP_ENGINE}')
+    honorificPattern = re.compile('|'.join(f'(?P<{gender}>{"|".join(map(re.escape, honorifics))})'
+                                           for gender, honorifics in (('man', MALE_HONORIFICS),
+                                                                      ('woman', FEMALE_HONORIFICS)) if honorifics)
+                                  or '(?!)')
+
+    if BENCHMARK:
+        setupBenchmark()
+
+    shutdown()
+    responseCache = ResponseCache(CACHE_PATH, CACHE_MAX_SIZE) if CACHE_ENABLED else None
+    connectionPool = ConnectionPool(POOL_SIZE)
+    rateLimiter = RateLimiter(MAX_REQUESTS_PER_SECOND, MAX_IN_FLIGHT)
+    candidateFetcher = CandidateFetcher(SEARCH_WORKERS, MAX_MEMOIZED_QUERIES)
+    localIndex = LocalIndex(LOCAL_INDEX_PATH) if USE_LOCAL_INDEX else None
+    lookupEngine = localIndex or (ActionEngine(ACTION_API_URL) if LOOKUP_ENGINE == 'action' else None)
+    peopleJournal = outputStore(PEOPLE_OUT)
+    placesJournal = outputStore(PLACES_OUT)
+    peopleProgress = Progress(f'{PEOPLE_OUT}.progress', peopleJournal)
+    placesProgress = Progress(f'{PLACES_OUT}.progress', placesJournal)
+    reviewKeys = None
+
+# Function to turn a name, or a dict with a name, a VIAF ID, aliases and optional coordinates, into an entity
+def recordEntity(record):
+    if not isinstance(record, (str, dict)):
+        raise ValueError('a name or an object is required')
+    entity = {'name': record} if isinstance(record, str) else dict(record)
+    if not isinstance(entity.get('name'), str) or not entity['name'].strip():
+        raise ValueError('a name is required')
+    aliases = entity.get('aliases')
+    if aliases is not None and not (isinstance(aliases, list) and all(isinstance(x, str) and x.strip() for x in aliases)):
+        raise ValueError('aliases must be a list of names')
+    for name in ('viaf', 'lat', 'lon'):
+        if entity.get(name) is not None and (isinstance(entity[name], bool) or not isinstance(entity[name], (str, int, float))):
+            raise ValueError(f'{name} must be a string or a number')
+    entity['viaf'] = str(entity['viaf']) if entity.get('viaf') else None
+    entity['aliases'] = [x for x in entity.get('aliases') or [] if x != entity['name']]
+    return entity
+
+# Matcher for other programs, matching people and places without asking (unless AUTO_MATCH=False is given),
+# quietly and without queueing reviews (unless QUIET=False or REVIEW_OUT is given), and keeping its connections,
+# caches and resolved queries from one call to the next
+# (they are the module's, so only one matcher can be open at a time)
+class Matcher:
+    active = None
+
+    def __init__(self, **options):
+        global nameIndex
+        if Matcher.active:
+            raise RuntimeError('another Matcher is open (close it first)')
+        options.setdefault('AUTO_MATCH', True)
+        options.setdefault('MATCH_PEOPLE', True)
+        options.setdefault('QUIET', True)
+        options.setdefault('REVIEW_OUT', None)
+        configure(**options)
+        Matcher.active = self
+
+        # Build the local name index from cached results
+        if USE_NAME_INDEX:
+            nameIndex = buildNameIndex()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # Function to turn names, or dicts with a name, a VIAF ID and aliases, into entities keyed by name and the
+    # name of each record (repeated records share one entity, different records with the same name are rejected)
+    @staticmethod
+    def entities(records):
+        entities = {}
+        names = []
+        for record in records:
+            entity = recordEntity(record)
+            if entities.setdefault(entity['name'], entity) != entity:
+                raise ValueError(f'different records with the same name: {entity["name"]}')
+            names.append(entity['name'])
+        return entities, names
+
+    # Function to match people and return them with the fields of their Wikidata match, one for each record in order
+    def match_people(self, people):
+        people, names = self.entities(people)
+        searchPeople(people)
+        return [copy.deepcopy(people[x]) for x in names]
+
+    # Function to match places and return them with the fields of their Wikidata match, one for each record in order
+    def match_places(self, places):
+        places, names = self.entities(places)
+        searchPlaces(places)
+        return [copy.deepcopy(places[x]) for x in names]
+
+    # Function to get the current Wikidata fields of matched entities, by Wikidata ID or IRI
+    def refresh(self, qids):
+        qids = [x.split('/')[-1] for x in qids]
+        statements = batchByQid(getStatementsBatch, qids)
+
+        refreshed = {}
+        for qid in qids:
+            label, desc, image, birth, death, gender, instanceOf, geo = statements[qid]
+            refreshed[qid] = {
+                'iri': f'http://www.wikidata.org/entity/{qid}' if label else None,
+                'name': label,
+                'desc': desc,
+                'image': image,
+                'birth': birth.split('T')[0] if birth else None,
+                'death': death.split('T')[0] if death else None,
+                'gender': 'woman' if gender == 'female' else 'man' if gender == 'male' else gender,
+                'lat': geo.split('(')[1].split(' ')[1].strip(')') if geo else None,
+                'lon': geo.split('(')[1].split(' ')[0] if geo else None,
+                'instanceOf': instanceOf,
+            }
+        return refreshed
+
+    # Function to sync the journals and close the cache, the worker threads and the local index
+    def close(self):
+        if Matcher.active is self:
+            shutdown()
+            Matcher.active = None
+
+# HTTP server matching the people and places posted as JSON, with one match running for identical lookups
+class MatchServer(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    types = {'/people': 'Q5', '/places': 'Q27096213'}
+    lock = threading.Lock()
+    inFlight = {}
+
+    # Function to match an entity, or wait for the results of the identical lookup being matched
+    @classmethod
+    def lookup(cls, entity, type):
+        key = (type, json.dumps(entity, sort_keys=True))
+        with cls.lock:
+            future = cls.inFlight.get(key)
+            new = future is None
+            if new:
+                future = cls.inFlight[key] = Future()
+        if not new:
+            metrics.add('coalescedLookups')
+            return future.result()
+
+        try:
+            with metrics.timer('lookup'):
+                match = autoMatch(entity['name'], entity, type)
+            future.set_result(dict(zip(MATCH_FIELDS, match), name=entity['name']))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with cls.lock:
+                del cls.inFlight[key]
+        return future.result()
+
+    # Function to send a JSON response
+    def reply(self, status, body):
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self.reply(200, metrics.summary())
+        else:
+            self.reply(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if self.path not in self.types:
+            self.reply(404, {'error': 'Not found'})
+            return
+        type = self.types[self.path]
+
+        # Read a person/place or a list of them
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)))
+            entities = [recordEntity(x) for x in (body if isinstance(body, list) else [body])]
+        except (ValueError, TypeError) as e:
+            self.reply(400, {'error': f'Invalid lookup: {e}'})
+            return
+
+        try:
+            # Resolve the VIAF IDs of a batch together, and fetch the candidates of all its names in the background
+            if len(entities) > 1:
+                resolveViafs(dict(enumerate(entities)), type)
+            prefetchCandidates([(x['name'], x) for x in entities], type)
+
+            matches = [self.lookup(x, type) for x in entities]
+        except Exception as e:
+            self.reply(502, {'error': f'Wikidata query failed: {e}'})
+            return
+        metrics.add('lookups', len(entities))
+        self.reply(200, matches if isinstance(body, list) else matches[0])
+
+    def log_message(self, *args):
+        pass
+
+# Function to serve lookups over HTTP until interrupted, keeping connections, caches and results in memory
+def serve():
+    global nameIndex
+
+    # Build the local name index from cached results
+    if USE_NAME_INDEX:
+        nameIndex = buildNameIndex()
+
+    server = http.server.ThreadingHTTPServer((SERVER_HOST, SERVER_PORT), MatchServer)
+    server.daemon_threads = True
+    print()
+    print(pink('   === Server ===\n'))
+    print(f'   Listening on http://{SERVER_HOST}:{server.server_port}')
+    print('   • POST a person or a list of people to ' + yellow('/people') + ', places to ' + yellow('/places'))
+    print('   • GET ' + yellow('/metrics') + ' for the counters and timings\n')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print()
+    finally:
+        server.server_close()
+
+    # Print the time spent in each phase
+    print(pink('   === Timing ===\n'))
+    metrics.report()
+
+# Function to run the matcher as configured: import or load people and places, search them and print statistics
+def run():
+    global nameIndex
+    start = time.perf_counter()
+    print()
+
+    # Build the local Wikidata index and stop
+    if BUILD_LOCAL_INDEX:
+        buildLocalIndex(WIKIDATA_DUMP, LOCAL_INDEX_PATH)
+        return
+
+    # Write the JSON files from the SQLite stores and stop
+    if EXPORT_JSON:
+        if not OUTPUT_SQLITE:
+            print(red('   The JSON files are only exported from the SQLite stores (see --sqlite)\n'))
+            return
+        for store, path in ((peopleJournal, PEOPLE_OUT), (placesJournal, PLACES_OUT)):
+            store.export(path)
+            print(f'   Exported {store.path} to {path}')
+        print()
+        return
+
+    # Compare the memory used by entity records and by dicts and stop
+    if BENCHMARK_RECORDS:
+        benchmarkRecords(BENCHMARK_RECORD_ROWS)
+        return
+
+    # Compare the lookup engines and stop
+    if BENCHMARK_ENGINES:
+        benchmarkEngines()
+        return
+
+    print(pink('   === Instructions ==='))
+    print('   • Press ' + yellow('return') + ' to go on')
+    print('   • Press ' + yellow('y') + ' to confirm')
+    print('   • Press ' + yellow('s') + ' to skip to next person/place')
+    print('   • Insert a ' + yellow('Wikidata ID') + ' (e.g. Q1067) to add it manually')
+    print()
+
+    # Read CSV file and extract person/place names
+    if IMPORT_FROM_CSV:
+        people, places = importCSV()
+    else:
+        # Load JSON file and journal of people
+        people = peopleJournal.load()
+
+        # Load JSON file and journal of places
+        places = placesJournal.load()
+
+    # Resume the interrupted search, or start a new one
+    for progress in (peopleProgress, placesProgress):
+        if IMPORT_FROM_CSV or not RESUME:
+            progress.reset()
+        else:
+            progress.load()
+
+    # Compare the name index with the Wikidata entity search and stop
+    if BENCHMARK_NAME_INDEX:
+        benchmarkNameIndex(people, places)
+        return
+
+    # Build the local name index from cached results and matched entities
+    if USE_NAME_INDEX:
+        nameIndex = buildNameIndex(((people, 'Q5'), (places, 'Q27096213')))
+
+    # Plan the queries of the search
+    if (SEARCH_WD_PEOPLE and people) or (SEARCH_WD_PLACES and places):
+        print(pink('   === Query Plan ===\n'))
+
+        for entities, type, search, progress in ((people, 'Q5', SEARCH_WD_PEOPLE, peopleProgress),
+                                                 (places, 'Q27096213', SEARCH_WD_PLACES, placesProgress)):
+            # People are only matched unattended or with MATCH_PEOPLE, so no query is planned for them otherwise
+            if search and entities and type == 'Q5' and not (AUTO_MATCH or MATCH_PEOPLE):
+                print('   People:   not matched (see --match-people), no queries planned')
+            elif search and entities:
+                naive, searches, searchBatches, viafBatches = planQueries(pendingEntities(entities, progress), type)
+                print(f'   {"People" if type == "Q5" else "Places"}:   {naive} queries without planning, '
+                      f'{searchBatches + viafBatches} planned ({searches} name searches in {searchBatches} queries '
+                      f'and {viafBatches} VIAF batches)')
+        print()
+
+        # Stop before running any query
+        if DRY_RUN:
+            return
+
+    # Review the cases queued by an unattended run
+    if REVIEW_MATCHES:
+        reviewMatches(people, places)
+
+    try:
+        # Search Wikidata for people
+        if SEARCH_WD_PEOPLE and len(people.keys()) > 0:
+            print(pink('   === Person Search ===\n'))
+            searchPeople(people, peopleJournal, peopleProgress)
+
+        # Search Wikidata for places
+        if SEARCH_WD_PLACES and len(places.keys()) > 0:
+            print(pink('   === Place Search ===\n'))
+            searchPlaces(places, placesJournal, placesProgress)
+
+    # Keep the progress to resume from the first pending person/place
+    except KeyboardInterrupt:
+        print(red('\n\n   Interrupted: the next run resumes from the first pending person/place\n'))
+
+    # Write the JSON files and empty the journals
+    if peopleJournal.dirty:
+        peopleJournal.compact(people)
+    if placesJournal.dirty:
+        placesJournal.compact(places)
+
+    report(people, places, start)
+
+# Function to parse the command line (only the options given are returned, by the name of their constant)
+def parseArguments(argv=None):
+    parser = argparse.ArgumentParser(description='Match people and places', argument_default=argparse.SUPPRESS)
+    parser.add_argument('-i', '--import', dest='IMPORT_FROM_CSV', action='store_true',
+                        help='load the CSV files and create new JSON files (overwriting them)')
+    parser.add_argument('-a', '--people', dest='SEARCH_WD_PEOPLE', action='store_true', help='search people')
+    parser.add_argument('-s', '--places', dest='SEARCH_WD_PLACES', action='store_true', help='search places')
+    parser.add_argument('--match-people', dest='MATCH_PEOPLE', action='store_true',
+                        help='also match people without Wikidata IRI in interactive runs')
+    parser.add_argument('-u', '--update-all', dest='UPDATE_ALL', action='store_true',
+                        help='update all matched entities with data from Wikidata')
+    parser.add_argument('--restart', dest='RESUME', action='store_false',
+                        help='search from the first person/place instead of resuming an interrupted search')
+    parser.add_argument('-n', '--dry-run', dest='DRY_RUN', action='store_true',
+                        help='only report the queries planned for the search')
+    parser.add_argument('--people-in', dest='PEOPLE_IN', metavar='CSV')
+    parser.add_argument('--places-in', dest='PLACES_IN', metavar='CSV')
+    parser.add_argument('--people-out', dest='PEOPLE_OUT', metavar='JSON')
+    parser.add_argument('--places-out', dest='PLACES_OUT', metavar='JSON')
+    parser.add_argument('--no-geo-ranking', dest='GEO_RANKING', action='store_false',
+                        help='do not rank the candidates of places by distance')
+    parser.add_argument('--geo-radius', dest='GEO_RADIUS', type=float, metavar='KM')
+    parser.add_argument('--geo-duplicate-distance', dest='GEO_DUPLICATE_DISTANCE', type=float, metavar='KM',
+                        help='match places this close to an earlier place with a similar name with it (0 to disable)')
+    parser.add_argument('--clusters', dest='CLUSTER_DUPLICATES', action='store_true',
+                        help='give probable duplicates the match of their cluster instead of searching them')
+    parser.add_argument('--cluster-similarity', dest='CLUSTER_SIMILARITY', type=float, metavar='RATIO')
+    parser.add_argument('--people-normalization', dest='PEOPLE_NORMALIZATION', type=lambda x: x.split(',') if x else [],
+                        metavar='RULES', help='normalization rules of people, comma-separated')
+    parser.add_argument('--places-normalization', dest='PLACES_NORMALIZATION', type=lambda x: x.split(',') if x else [],
+                        metavar='RULES', help='normalization rules of places, comma-separated')
+    parser.add_argument('--sqlite', dest='OUTPUT_SQLITE', action='store_true',
+                        help='keep people and places in indexed SQLite stores next to the JSON files')
+    parser.add_argument('--export-json', dest='EXPORT_JSON', action='store_true',
+                        help='write the JSON files from the SQLite stores and exit')
+    parser.add_argument('--auto', dest='AUTO_MATCH', action='store_true',
+                        help='match without asking and queue the unclear cases for review')
+    parser.add_argument('--threshold', dest='AUTO_MATCH_THRESHOLD', type=float, metavar='SCORE', help='score of an automatic match')
+    parser.add_argument('--review', dest='REVIEW_MATCHES', action='store_true',
+                        help='review the cases queued by an unattended run')
+    parser.add_argument('--review-out', dest='REVIEW_OUT', metavar='JSONL')
+    parser.add_argument('--build-local-index', dest='BUILD_LOCAL_INDEX', action='store_true',
+                        help='build the local Wikidata index from a JSON dump and exit')
+    parser.add_argument('--dump', dest='WIKIDATA_DUMP', metavar='PATH', help='Wikidata JSON dump (.json.gz or .json.bz2)')
+    parser.add_argument('--local-index', dest='USE_LOCAL_INDEX', action='store_true',
+                        help='run all queries against the local Wikidata index')
+    parser.add_argument('--local-index-path', dest='LOCAL_INDEX_PATH', metavar='PATH')
+    parser.add_argument('--engine', dest='LOOKUP_ENGINE', choices=['sparql', 'action'],
+                        help='run the lookups with SPARQL or with the MediaWiki Action API')
+    parser.add_argument('--action-api-url', dest='ACTION_API_URL', metavar='URL')
+    parser.add_argument('--name-index', dest='USE_NAME_INDEX', action='store_true',
+                        help='search names in the local fuzzy name index')
+    parser.add_argument('--benchmark-name-index', dest='BENCHMARK_NAME_INDEX', action='store_true',
+                        help='compare the name index with the Wikidata entity search and exit')
+    parser.add_argument('--benchmark-records', dest='BENCHMARK_RECORDS', action='store_true',
+                        help='compare the memory used by entity records and by dicts and exit')
+    parser.add_argument('--benchmark-record-rows', dest='BENCHMARK_RECORD_ROWS', type=int, metavar='N')
+    parser.add_argument('--benchmark', dest='BENCHMARK', action='store_true',
+                        help='benchmark an unattended run against a local stub endpoint')
+    parser.add_argument('--benchmark-rows', dest='BENCHMARK_ROWS', type=int, metavar='N')
+    parser.add_argument('--benchmark-engines', dest='BENCHMARK_ENGINES', action='store_true',
+                        help='compare the lookup engines by running the benchmark with each of them')
+    parser.add_argument('--stub-latency', dest='STUB_LATENCY', type=float, metavar='SECONDS')
+    parser.add_argument('--stub-error-rate', dest='STUB_ERROR_RATE', type=float, metavar='SHARE')
+    parser.add_argument('--rate', dest='MAX_REQUESTS_PER_SECOND', type=float, metavar='N',
+                        help='maximum requests per second (0 for no limit)')
+    parser.add_argument('--workers', dest='SEARCH_WORKERS', type=int, metavar='N', help='worker threads fetching candidates')
+    parser.add_argument('--search-batch-size', dest='SEARCH_BATCH_SIZE', type=int, metavar='N',
+                        help='names searched with each query when fetching candidates ahead')
+    parser.add_argument('--no-cache', dest='CACHE_ENABLED', action='store_false', help='do not cache responses')
+    parser.add_argument('--cache-path', dest='CACHE_PATH', metavar='PATH')
+    parser.add_argument('--offline', dest='CACHE_OFFLINE', action='store_true', help='only replay cached responses')
+    parser.add_argument('--metrics-out', dest='METRICS_OUT', metavar='JSON', help='write the run metrics to a file')
+    parser.add_argument('--shards', dest='SHARDS', type=int, metavar='N',
+                        help='search in N worker processes, each with a hash partition of the people and places')
+    parser.add_argument('--serve', dest='SERVE', action='store_true',
+                        help='serve lookups over HTTP (POST JSON to /people or /places)')
+    parser.add_argument('--host', dest='SERVER_HOST', metavar='HOST')
+    parser.add_argument('--port', dest='SERVER_PORT', type=int, metavar='PORT')
+    return vars(parser.parse_args(argv))
+
+# Function to run the matcher from the command line
+def main(argv=None):
+    options = parseArguments(argv)
+
+    # Search only the types given on the command line, if any
+    if 'SEARCH_WD_PEOPLE' in options or 'SEARCH_WD_PLACES' in options:
+        options.setdefault('SEARCH_WD_PEOPLE', False)
+        options.setdefault('SEARCH_WD_PLACES', False)
+
+    # Limit the benchmark to the request rate given on the command line, if any
+    if 'MAX_REQUESTS_PER_SECOND' in options:
+        options.setdefault('BENCHMARK_RATE', options['MAX_REQUESTS_PER_SECOND'])
+
+    configure(**options)
+    if SERVE:
+        serve()
+    elif SHARDS > 1 and not (BUILD_LOCAL_INDEX or BENCHMARK_NAME_INDEX or BENCHMARK_RECORDS or BENCHMARK_ENGINES
+                             or EXPORT_JSON or DRY_RUN or REVIEW_MATCHES):
+        runShards()
+    else:
+        run()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+import os
+import sys
+
+# Import the matcher from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import pytest
+
+from entity_matcher import StubEndpoint
+
+
+@pytest.fixture(scope='session')
+def stub_url():
+    return StubEndpoint.start('/nonexistent')
+
+
+# Options running the matcher against the stub endpoint, without the cache and with its outputs in a temporary directory
+@pytest.fixture
+def stub_options(stub_url, tmp_path):
+    return {
+        'CACHE_ENABLED': False,
+        'BASE_PATH': str(tmp_path),
+        'PEOPLE_OUT': str(tmp_path / 'sloane_people.json'),
+        'PLACES_OUT': str(tmp_path / 'sloane_places.json'),
+        'REVIEW_OUT': str(tmp_path / 'sloane_review.jsonl'),
+        'WD_URL': f'{stub_url}/sparql?query=',
+        'ACTION_API_URL': f'{stub_url}/w/api.php',
+        'STUB_LATENCY': 0,
+        'MAX_REQUESTS_PER_SECOND': 0,
+        'LOOKUP_ENGINE': 'sparql',
+    }
@@ -0,0 +1,48 @@
+import entity_matcher
+from entity_matcher import clusterDuplicates, phoneticKey, similarKeys
+
+
+# Function to make people or places from their names and other fields
+def entities(*records):
+    return {record['name']: dict({'viaf': None, 'aliases': []}, **record) for record in records}
+
+
+def test_clusters_are_off_by_default():
+    people = entities({'name': 'Hans Sloane'}, {'name': 'Hans Sloan'})
+    assert clusterDuplicates(people, 'Q5') == {}
+
+
+def test_spelling_variants_are_clustered(monkeypatch):
+    monkeypatch.setattr(entity_matcher, 'CLUSTER_DUPLICATES', True)
+    assert similarKeys(phoneticKey('Hans Sloane'), phoneticKey('Hanns Sloan'))
+    people = entities({'name': 'Hans Sloane', 'birth': '1660-04-16'}, {'name': 'Hanns Sloan', 'birth': '1660'},
+                      {'name': 'Sir Hans Sloane'})
+    assert clusterDuplicates(people, 'Q5') == {'Hanns Sloan': 'Hans Sloane', 'Sir Hans Sloane': 'Hans Sloane'}
+
+
+def test_namesakes_are_not_clustered(monkeypatch):
+    monkeypatch.setattr(entity_matcher, 'CLUSTER_DUPLICATES', True)
+
+    # Father and son, and people with different VIAF IDs
+    people = entities({'name': 'John Tradescant', 'birth': '1570'}, {'name': 'John Tradescant the Younger',
+                                                                    'aliases': ['John Tradescant'], 'birth': '1608'},
+                      {'name': 'James Petiver', 'viaf': '1'}, {'name': 'James Petiver (apothecary)', 'viaf': '2',
+                                                               'aliases': ['James Petiver']})
+    assert clusterDuplicates(people, 'Q5') == {}
+
+    # Places with the same name on different continents
+    places = entities({'name': "St John's", 'lat': '47.56', 'lon': '-52.71'},
+                      {'name': "St John's (Antigua)", 'aliases': ["St John's"], 'lat': '17.12', 'lon': '-61.85'})
+    assert clusterDuplicates(places, 'Q27096213') == {}
+
+
+def test_initials_and_title_abbreviations_are_clustered(monkeypatch):
+    monkeypatch.setattr(entity_matcher, 'CLUSTER_DUPLICATES', True)
+    assert similarKeys(phoneticKey('D. of Marlborough'), phoneticKey('Duke of Marlborough'))
+    assert phoneticKey('Ctss of Oxford') == phoneticKey('Countess of Oxford')
+    assert not similarKeys(phoneticKey('J. S.'), phoneticKey('John Smith'))
+
+    people = entities({'name': 'Duke of Marlborough'}, {'name': 'D. of Marlborough'}, {'name': 'Ctss of Oxford'},
+                      {'name': 'Countess of Oxford'})
+    assert clusterDuplicates(people, 'Q5') == {'D. of Marlborough': 'Duke of Marlborough',
+                                               'Countess of Oxford': 'Ctss of Oxford'}
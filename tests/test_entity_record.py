@@ -0,0 +1,62 @@
+import gc
+import json
+import tracemalloc
+
+from entity_matcher import EntityRecord, WD_ENTITY
+
+# People in the shape of sloane_people.json, with unmatched and odd values and keys the records have no slot for
+PEOPLE = {
+    'Hans Sloane': {
+        'name': 'Hans Sloane', 'viaf': '27349086', 'aliases': ['Sir Hans Sloane', 'Sloane, Hans'],
+        'iri': 'http://www.wikidata.org/entity/Q312616', 'desc': 'Irish physician, naturalist and collector (1660–1753)',
+        'image': 'http://commons.wikimedia.org/wiki/Special:FilePath/Sir%20Hans%20Sloane.jpg',
+        'gender': 'man', 'birth': '1660-04-16', 'death': '1753-01-11',
+    },
+    'Mary Delany': {
+        'viaf': None, 'name': 'Mary Delany', 'aliases': [], 'iri': None, 'desc': None, 'image': None,
+        'gender': 'woman', 'birth': None, 'death': None,
+    },
+    'José Celestino Mutis': {
+        'name': 'José Celestino Mutis', 'viaf': '59094404', 'aliases': ['Mutis, José Celestino', 'Мутис'],
+        'iri': 'http://www.wikidata.org/entity/Q0312', 'gender': None, 'status': 'reviewed',
+        'instanceOf': ['Q5'], 'sources': {'csv': 3, 'notes': None}, 'score': 0.95,
+    },
+    'Francis Williams': {
+        'name': 'Francis Williams', 'iri': 'https://example.org/people/1', 'aliases': ['Williams', 7],
+        'lat': None, 'lon': None,
+    },
+}
+
+
+def test_records_write_the_json_they_are_loaded_from():
+    records = {key: EntityRecord(entity) for key, entity in PEOPLE.items()}
+    assert {key: x.toDict() for key, x in records.items()} == PEOPLE
+    assert json.dumps(records, default=EntityRecord.toDict) == json.dumps(PEOPLE)
+    assert json.dumps(records, default=EntityRecord.toDict, ensure_ascii=False, indent=2) \
+        == json.dumps(PEOPLE, ensure_ascii=False, indent=2)
+
+
+def test_records_keep_their_fields_through_updates():
+    record = EntityRecord(PEOPLE['Mary Delany'])
+    record['iri'] = f'{WD_ENTITY}261236'
+    record['aliases'] = ['Mary Granville']
+    record['matchedBy'] = 'viaf'
+    del record['image']
+    expected = dict(PEOPLE['Mary Delany'], iri=f'{WD_ENTITY}261236', aliases=['Mary Granville'], matchedBy='viaf')
+    del expected['image']
+    assert json.dumps(record, default=EntityRecord.toDict) == json.dumps(expected)
+    assert record.get('image') is None and 'image' not in record
+
+
+def test_records_use_less_memory_than_dicts():
+    people = [dict(PEOPLE['Hans Sloane'], name=f'Hans Sloane {i}', iri=f'{WD_ENTITY}{1000000 + i}')
+              for i in range(2000)]
+    sizes = []
+    for make in (dict, EntityRecord):
+        gc.collect()
+        tracemalloc.start()
+        entities = [make(x) for x in people]
+        sizes.append(tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+        del entities
+    assert sizes[1] < sizes[0]
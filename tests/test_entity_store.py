@@ -0,0 +1,61 @@
+import json
+
+from entity_matcher import EntityRecord, EntityStore, Journal
+
+# Places in the shape of sloane_places.json, with aliases, None fields, non-ASCII names and extra keys
+PLACES = {
+    'Jamaica': {
+        'name': 'Jamaica', 'viaf': None, 'aliases': ['Xaymaca', 'Isla de Santiago'],
+        'iri': 'http://www.wikidata.org/entity/Q766', 'desc': 'island country in the Caribbean Sea',
+        'image': None, 'lat': '18.18', 'lon': '-77.4',
+    },
+    'Zürich': {
+        'name': 'Zürich', 'viaf': '158902482', 'aliases': ['Zurich', 'Цюрих', '蘇黎世'], 'iri': None,
+        'desc': None, 'image': None, 'lat': None, 'lon': None,
+    },
+    'Killyleagh (Co. Down)': {
+        'name': 'Killyleagh', 'aliases': [], 'iri': 'http://www.wikidata.org/entity/Q1015447',
+        'lat': '54.4', 'lon': '-5.65', 'status': 'reviewed', 'sources': {'csv': 2},
+    },
+    'São Paulo "de Loanda"': {'name': 'Luanda', 'viaf': None, 'aliases': ['São Paulo de Loanda', 'Luanda']},
+}
+
+
+# Function to read a JSON file as bytes, and as JSON with its keys sorted
+def exported(path):
+    with open(path, 'rb') as f:
+        content = f.read()
+    return content, json.dumps(json.loads(content), sort_keys=True)
+
+
+def test_store_exports_the_json_of_the_journal(tmp_path):
+    journal = Journal(str(tmp_path / 'journal.json'))
+    journal.compact(PLACES)
+    snapshot, sortedSnapshot = exported(journal.path)
+
+    # Load the JSON into a store, then export it
+    store = EntityStore(str(tmp_path / 'places.sqlite'))
+    store.compact(journal.load())
+    store.export(str(tmp_path / 'export.json'))
+    assert exported(str(tmp_path / 'export.json')) == (snapshot, sortedSnapshot)
+
+    # Write the entities again one by one, as a search does, and export them after reopening the store
+    for key, place in json.loads(snapshot).items():
+        store.write(key, place)
+    store.close()
+    store = EntityStore(str(tmp_path / 'places.sqlite'))
+    store.export(str(tmp_path / 'export.json'))
+    assert exported(str(tmp_path / 'export.json')) == (snapshot, sortedSnapshot)
+    assert json.dumps(store.load(), default=EntityRecord.toDict) == json.dumps(PLACES)
+    store.close()
+
+
+def test_store_finds_entities_by_id_and_name(tmp_path):
+    store = EntityStore(str(tmp_path / 'places.sqlite'))
+    store.compact(PLACES)
+    assert list(store.find(qid='Q766')) == ['Jamaica']
+    assert list(store.find(viaf='158902482')) == ['Zürich']
+    assert list(store.find(name='цюрих')) == ['Zürich']
+    assert list(store.find(name='luanda')) == ['São Paulo "de Loanda"']
+    assert store.find(name='Killyleagh')['Killyleagh (Co. Down)'].toDict() == PLACES['Killyleagh (Co. Down)']
+    store.close()
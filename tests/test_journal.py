@@ -0,0 +1,72 @@
+import json
+
+from entity_matcher import Journal, Progress
+
+
+# Function to make a person as the importer does
+def person(name):
+    return {'name': name, 'viaf': None, 'aliases': []}
+
+
+# Function to simulate a crash while an entry is being appended to the journal
+def crash(journal):
+    journal.sync()
+    journal.file.write('{"key": "torn", "entity": {"na')
+    journal.file.close()
+    journal.file = None
+
+
+def test_journal_survives_two_crashes_in_a_row(tmp_path):
+    path = str(tmp_path / 'sloane_people.json')
+
+    # First run: two updates, then a crash in the middle of the third
+    journal = Journal(path)
+    assert journal.load() == {}
+    journal.write('Hans Sloane', person('Hans Sloane'))
+    journal.write('John Ray', person('John Ray'))
+    crash(journal)
+
+    # Second run: replays the first one, adds an update and crashes again before compacting
+    journal = Journal(path)
+    assert list(journal.load()) == ['Hans Sloane', 'John Ray']
+    journal.write('Mary Somerset', person('Mary Somerset'))
+    crash(journal)
+
+    # Third run: every complete update of both runs is replayed
+    journal = Journal(path)
+    entities = journal.load()
+    assert list(entities) == ['Hans Sloane', 'John Ray', 'Mary Somerset']
+    assert entities['Mary Somerset'].toDict() == person('Mary Somerset')
+    journal.close()
+
+
+def test_journal_adds_missing_newline_after_last_entry(tmp_path):
+    path = str(tmp_path / 'sloane_places.json')
+    with open(f'{path}.journal', 'w') as f:
+        f.write(json.dumps({'key': 'Jamaica', 'entity': person('Jamaica')}))
+
+    journal = Journal(path)
+    journal.load()
+    journal.write('Barbados', person('Barbados'))
+    journal.close()
+
+    assert list(Journal(path).load()) == ['Jamaica', 'Barbados']
+
+
+def test_progress_survives_two_crashes_in_a_row(tmp_path):
+    path = str(tmp_path / 'sloane_people.json.progress')
+
+    for run, key in enumerate(['Hans Sloane', 'John Ray']):
+        progress = Progress(path, None)
+        progress.load()
+        assert list(progress.status) == ['Hans Sloane'][:run]
+        progress.write(key, 'matched', run + 1)
+        progress.sync()
+        progress.file.write('{"key": "torn", "sta')
+        progress.file.close()
+        progress.file = None
+
+    progress = Progress(path, None)
+    progress.load()
+    assert progress.status == {'Hans Sloane': 'matched', 'John Ray': 'matched'}
+    assert progress.cursor == 2
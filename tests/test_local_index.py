@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from entity_matcher import LocalIndex, buildLocalIndex
+
+DUMP = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'fixtures', 'wikidata_dump.json')
+
+
+@pytest.fixture(scope='module')
+def index(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('index') / 'wikidata_local.sqlite')
+    buildLocalIndex(DUMP, path)
+    index = LocalIndex(path)
+    yield index
+    index.close()
+
+
+# Function to get the Wikidata IDs of SPARQL-shaped results
+def qids(results):
+    return [x['item']['value'].split('/')[-1] for x in results]
+
+
+def test_search_by_label_and_alias(index):
+    assert qids(index.search('Hans Sloane', 'Q5')) == ['Q312616']
+    assert qids(index.search('sir hans sloane', 'Q5')) == ['Q312616']
+    assert qids(index.search('Xaymaca', 'Q27096213')) == ['Q766']
+    assert qids(index.search('Jamaica', 'Q5')) == []
+
+
+def test_search_results_are_shaped_like_sparql_results(index):
+    assert index.search('Hans Sloane', 'Q5') == [{
+        'item': {'value': 'http://www.wikidata.org/entity/Q312616'},
+        'itemLabel': {'value': 'Hans Sloane'},
+        'itemDescription': {'value': 'Irish physician, naturalist and collector (1660–1753)'},
+        'image': {'value': 'http://commons.wikimedia.org/wiki/Special:FilePath/Sir%20Hans%20Sloane.jpg'},
+        'birth': {'value': '1660-04-16T00:00:00Z'},
+        'death': {'value': '1753-01-11T00:00:00Z'},
+        'genderLabel': {'value': 'male'},
+    }]
+    assert index.search('Killyleagh', 'Q27096213')[0]['geo'] == {'value': 'Point(-5.65 54.4)'}
+
+
+def test_viaf(index):
+    assert qids(index.viaf('27349086')) == ['Q312616']
+    assert index.viaf('1') == []
+
+
+def test_statements(index):
+    assert index.statements('Q312616') == (
+        'Hans Sloane', 'Irish physician, naturalist and collector (1660–1753)',
+        'http://commons.wikimedia.org/wiki/Special:FilePath/Sir%20Hans%20Sloane.jpg',
+        '1660-04-16T00:00:00Z', '1753-01-11T00:00:00Z', 'male', 'human', None)
+    assert index.statements('Q1015447') == (
+        'Killyleagh', 'village in County Down, Northern Ireland', None, None, None, None, 'town', 'Point(-5.65 54.4)')
+    assert index.statements('Q1') == (None, None, None, None, None, None, None, None)
+
+
+def test_statements_follow_redirects(index):
+    assert index.statements('Q99312616') == index.statements('Q312616')
+    assert qids(index.bindings([99312616])) == ['Q312616']
+
+
+def test_birth_country(index):
+    assert index.birthCountry('Q5371480') == 'Jamaica'
+    assert index.birthCountry('Q312616') is False
+    assert index.birthCountryBatch(['Q5371480', 'Q99312616']) == {'Q5371480': 'Jamaica', 'Q99312616': False}
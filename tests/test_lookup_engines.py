@@ -0,0 +1,113 @@
+import pytest
+
+import entity_matcher
+from entity_matcher import ActionEngine, buildNameIndex, configure, getBirthCountry, getBirthCountryBatch, getStatements, \
+    getStatementsBatch, shutdown, wdQuery, wdSearchBatchQuery, wdViafBatchQuery, wdViafQuery
+
+
+@pytest.fixture
+def cached(stub_options, tmp_path):
+    yield dict(stub_options, CACHE_ENABLED=True, CACHE_PATH=str(tmp_path / 'cache.sqlite'))
+    shutdown()
+
+
+def test_name_index_skips_action_api_responses(cached):
+    configure(**dict(cached, LOOKUP_ENGINE='action'))
+    assert wdQuery('London', 'Q27096213')
+    configure(**cached)
+    assert wdQuery('Leiden', 'Q27096213')
+
+    index = buildNameIndex()
+    assert index.search('Leiden', 'Q27096213')
+    assert not index.search('London', 'Q27096213')
+    assert entity_matcher.responseCache.db.execute('SELECT COUNT(*) FROM responses WHERE query LIKE ?',
+                                                   (f'{ActionEngine.cachePrefix}%',)).fetchone()[0]
+
+
+# Names and VIAF IDs the stub endpoint finds entities for with both engines, and one it finds none for
+PEOPLE = ['James Petiver', 'Leonard Plukenet', 'Martin Lister']
+PLACES = ['London', 'Barbados', 'Leiden']
+VIAFS = ['59094404', '7457153']
+MISSING = 'Hans Sloane'
+MISSING_VIAF = '27349086'
+
+# People born in Peru (by the stub's birthplaces and countries of both engines) and in Europe
+BORN_OUTSIDE_EUROPE = 'Q20'
+BORN_IN_EUROPE = 'Q312616'
+
+
+# Function to run the lookups of both engines against the stub endpoint
+@pytest.fixture(scope='module')
+def lookups(stub_url, tmp_path_factory):
+    path = tmp_path_factory.mktemp('engines')
+    results = {}
+    for engine in ('sparql', 'action'):
+        configure(CACHE_ENABLED=False, BASE_PATH=str(path), PEOPLE_OUT=str(path / 'sloane_people.json'),
+                  PLACES_OUT=str(path / 'sloane_places.json'), WD_URL=f'{stub_url}/sparql?query=',
+                  ACTION_API_URL=f'{stub_url}/w/api.php', STUB_LATENCY=0, MAX_REQUESTS_PER_SECOND=0,
+                  LOOKUP_ENGINE=engine)
+        results[engine] = {
+            'people': {name: wdQuery(name, 'Q5') for name in PEOPLE + [MISSING]},
+            'places': {name: wdQuery(name, 'Q27096213') for name in PLACES},
+            'peopleBatch': wdSearchBatchQuery(PEOPLE + [MISSING], 'Q5'),
+            'placesBatch': wdSearchBatchQuery(PLACES, 'Q27096213'),
+            'viaf': {viaf: wdViafQuery(viaf, 'Q5') for viaf in VIAFS + [MISSING_VIAF]},
+            'viafBatch': wdViafBatchQuery(VIAFS + [MISSING_VIAF], 'Q5'),
+            'statements': {qid: getStatements(qid) for qid in (BORN_OUTSIDE_EUROPE, BORN_IN_EUROPE)},
+            'statementsBatch': getStatementsBatch([BORN_OUTSIDE_EUROPE, BORN_IN_EUROPE]),
+            'country': {qid: getBirthCountry(qid) for qid in (BORN_OUTSIDE_EUROPE, BORN_IN_EUROPE)},
+            'countryBatch': getBirthCountryBatch([BORN_OUTSIDE_EUROPE, BORN_IN_EUROPE]),
+        }
+    shutdown()
+    return results
+
+
+# Function to get the fields of bindings and whether all their values are strings
+def shape(bindings):
+    return [(sorted(x), all(type(value) is dict and type(value['value']) is str for value in x.values()))
+            for x in bindings]
+
+
+@pytest.mark.parametrize('kind, names', [('people', PEOPLE), ('places', PLACES)])
+def test_searches_have_the_same_shape(lookups, kind, names):
+    sparql, action = lookups['sparql'][kind], lookups['action'][kind]
+    for name in names:
+        assert sparql[name] and action[name]
+        assert set(map(str, shape(sparql[name]))) == set(map(str, shape(action[name])))
+        assert all(x['itemLabel']['value'].startswith(name) for x in sparql[name] + action[name])
+    assert sparql.get(MISSING, []) == action.get(MISSING, []) == []
+
+
+@pytest.mark.parametrize('engine', ['sparql', 'action'])
+def test_search_batches_split_by_name(lookups, engine):
+    results = lookups[engine]
+    assert results['peopleBatch'] == results['people']
+    assert results['placesBatch'] == results['places']
+
+
+def test_viaf_lookups_find_the_same_entities(lookups):
+    for engine in ('sparql', 'action'):
+        assert lookups[engine]['viafBatch'] == lookups[engine]['viaf']
+    sparql, action = lookups['sparql']['viaf'], lookups['action']['viaf']
+    assert list(sparql) == list(action) == VIAFS + [MISSING_VIAF]
+    for viaf in VIAFS:
+        assert shape(sparql[viaf]) == shape(action[viaf])
+        assert [x['itemLabel'] for x in sparql[viaf]] == [x['itemLabel'] for x in action[viaf]] == [{'value': f'VIAF {viaf}'}]
+    assert sparql[MISSING_VIAF] == action[MISSING_VIAF] == []
+
+
+def test_statements_have_the_same_shape(lookups):
+    for engine in ('sparql', 'action'):
+        assert lookups[engine]['statementsBatch'] == lookups[engine]['statements']
+    for qid in (BORN_OUTSIDE_EUROPE, BORN_IN_EUROPE):
+        sparql, action = lookups['sparql']['statements'][qid], lookups['action']['statements'][qid]
+        assert len(sparql) == len(action) == 8
+        assert [type(x) for x in sparql] == [type(x) for x in action]
+        assert (sparql[0], sparql[6]) == (action[0], action[6]) == (f'Label of {qid}', 'human')
+
+
+def test_birth_countries_are_the_same(lookups):
+    for engine in ('sparql', 'action'):
+        assert lookups[engine]['countryBatch'] == lookups[engine]['country']
+    assert lookups['sparql']['country'] == lookups['action']['country'] == {BORN_OUTSIDE_EUROPE: 'Peru',
+                                                                            BORN_IN_EUROPE: False}
@@ -0,0 +1,59 @@
+import contextlib
+import io
+import os
+
+import pytest
+
+import entity_matcher
+from entity_matcher import Matcher, configure, red, shutdown
+
+
+def test_one_result_per_record_in_order(stub_options):
+    with Matcher(**stub_options) as matcher:
+        people = matcher.match_people(['Hans Sloane', {'name': 'Mary Delany', 'viaf': None}, 'Hans Sloane'])
+        places = matcher.match_places(['Jamaica', 'Jamaica'])
+
+    assert [x['name'] for x in people] == ['Hans Sloane', 'Mary Delany', 'Hans Sloane']
+    assert people[0] == people[2] and people[0] is not people[2]
+    assert len(places) == 2 and places[0] == places[1]
+
+
+def test_different_records_with_the_same_name_are_rejected(stub_options):
+    with Matcher(**stub_options) as matcher:
+        with pytest.raises(ValueError):
+            matcher.match_people([{'name': 'John Smith', 'viaf': '1'}, {'name': 'John Smith', 'viaf': '2'}])
+
+
+def test_only_one_matcher_is_open(stub_options):
+    first = Matcher(**stub_options)
+    with pytest.raises(RuntimeError):
+        Matcher(**stub_options)
+    first.close()
+    first.close()
+
+    with Matcher(**stub_options) as second:
+        first.close()
+        assert second.match_places(['Jamaica'])[0].get('iri')
+
+
+def test_matcher_is_quiet_without_a_terminal(stub_options, tmp_path):
+    options = dict(stub_options)
+    del options['REVIEW_OUT']
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), Matcher(**options) as matcher:
+        assert len(matcher.match_people(['James Petiver', 'Martin Lister'])) == 2
+        assert red('error') == 'error'
+    assert output.getvalue() == ''
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_base_path_moves_the_paths_under_it(tmp_path):
+    configure(BASE_PATH=str(tmp_path), CACHE_ENABLED=False, PEOPLE_OUT='people.json')
+    try:
+        assert entity_matcher.REVIEW_OUT == f'{tmp_path}/sloane_review.jsonl'
+        assert entity_matcher.CACHE_PATH == f'{tmp_path}/sloane_cache.sqlite'
+        assert entity_matcher.SHARDS_PATH == f'{tmp_path}/shards'
+        assert entity_matcher.PEOPLE_OUT == 'people.json'
+    finally:
+        configure(BASE_PATH=os.path.dirname(entity_matcher.__file__), CACHE_ENABLED=False)
+        shutdown()
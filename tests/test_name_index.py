@@ -0,0 +1,13 @@
+import entity_matcher
+from entity_matcher import NameIndex
+
+
+def test_search_returns_name_index_top_candidates(monkeypatch):
+    index = NameIndex()
+    for i in range(20):
+        index.add(f'Q{i}', 'Q5', f'John Smith {i}')
+    assert len(index.search('John Smith', 'Q5')) == 10
+
+    monkeypatch.setattr(entity_matcher, 'NAME_INDEX_TOP', 3)
+    assert len(index.search('John Smith', 'Q5')) == 3
+    assert len(index.search('John Smith', 'Q5', top=5)) == 5
@@ -0,0 +1,131 @@
+import http.client
+import http.server
+import threading
+import time
+import urllib.error
+import urllib.parse
+
+import pytest
+
+import entity_matcher
+from entity_matcher import configure, loadURL, openURL, shutdown
+
+
+# Connection closed by the server while it was idle in the pool (the request is lost and no response comes)
+class StaleConnection(http.client.HTTPConnection):
+    def request(self, *args, **kwargs):
+        pass
+
+    def getresponse(self):
+        raise http.client.RemoteDisconnected('Remote end closed connection without response')
+
+
+@pytest.fixture
+def network(stub_options):
+    configure(**stub_options)
+    yield urllib.parse.urlsplit(stub_options['WD_URL'])
+    shutdown()
+
+
+def test_stale_pooled_connections_are_replaced(network):
+    pool = entity_matcher.connectionPool
+    pool.idle[(network.scheme, network.netloc)] = [StaleConnection(network.netloc) for i in range(pool.size)]
+
+    assert b'"bindings"' in openURL(f'{network.scheme}://{network.netloc}/sparql?query=SELECT')
+    assert [type(x) for x in pool.idle[(network.scheme, network.netloc)]] == [http.client.HTTPConnection]
+
+
+def test_stale_connections_on_retry_raise_url_error(network, monkeypatch):
+    pool = entity_matcher.connectionPool
+    monkeypatch.setattr(pool, 'get', lambda scheme, host: (StaleConnection(host), True))
+    with pytest.raises(urllib.error.URLError):
+        openURL(f'{network.scheme}://{network.netloc}/sparql?query=SELECT')
+
+
+# Server answering each request with the next scripted status (200 once the script is done)
+class ScriptedServer(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    script = []
+    requests = 0
+
+    def do_GET(self):
+        ScriptedServer.requests += 1
+        status, headers = ScriptedServer.script.pop(0) if ScriptedServer.script else (200, {})
+        body = b'{"results": {"bindings": []}}' if status == 200 else b''
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def scripted(stub_options, monkeypatch):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ScriptedServer)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True).start()
+    ScriptedServer.script = []
+    ScriptedServer.requests = 0
+    configure(**dict(stub_options, MAX_REQUESTS_PER_SECOND=100, MAX_RETRIES=2, BACKOFF_BASE=0.5, BACKOFF_MAX=60))
+
+    # Record the waits instead of sleeping
+    sleeps = []
+    monkeypatch.setattr(entity_matcher.time, 'sleep', sleeps.append)
+    yield f'http://127.0.0.1:{server.server_port}/sparql', sleeps
+    server.shutdown()
+    server.server_close()
+    shutdown()
+
+
+def test_throttling_pauses_for_retry_after_and_lowers_the_rate(scripted):
+    url, sleeps = scripted
+    counters = dict(entity_matcher.metrics.counters)
+    ScriptedServer.script = [(429, {'Retry-After': '7'})]
+    start = time.monotonic()
+    assert loadURL(url) == '{"results": {"bindings": []}}'
+    assert ScriptedServer.requests == 2
+    assert 7 in sleeps
+    assert entity_matcher.rateLimiter.next >= start + 7
+    assert entity_matcher.rateLimiter.rate == pytest.approx(50.1)
+    for name in ('throttled', 'rateDecreases', 'retries'):
+        assert entity_matcher.metrics.counters[name] == counters.get(name, 0) + 1
+
+
+def test_server_errors_are_retried_up_to_max_retries(scripted, monkeypatch):
+    url, sleeps = scripted
+    monkeypatch.setattr(entity_matcher.random, 'uniform', lambda low, high: high)
+    retries = entity_matcher.metrics.counters.get('retries', 0)
+    ScriptedServer.script = [(503, {})] * 3
+    with pytest.raises(urllib.error.HTTPError) as error:
+        loadURL(url)
+    assert error.value.code == 503
+    assert ScriptedServer.requests == 3
+    assert entity_matcher.metrics.counters['retries'] == retries + 2
+    assert 0.5 in sleeps and 1 in sleeps
+    assert entity_matcher.rateLimiter.rate == 100
+
+    # Other errors are not retried
+    ScriptedServer.script = [(404, {})]
+    with pytest.raises(urllib.error.HTTPError):
+        loadURL(url)
+    assert ScriptedServer.requests == 4
+
+
+def test_only_fast_successful_responses_raise_the_rate(scripted):
+    url, sleeps = scripted
+    limiter = entity_matcher.rateLimiter
+    limiter.rate = 40
+    ScriptedServer.script = [(503, {})]
+    with pytest.raises(urllib.error.HTTPError):
+        openURL(url)
+    assert limiter.rate == 40
+    assert loadURL(url)
+    assert limiter.rate == pytest.approx(40.1)
+
+    # Slow responses lower it
+    limiter.observe(entity_matcher.TARGET_LATENCY + 1)
+    assert limiter.rate == pytest.approx(20.05)
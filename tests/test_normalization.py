@@ -0,0 +1,66 @@
+import pytest
+
+import entity_matcher
+from entity_matcher import BANNED, configure, normalizationRules, normalizeEntity, processPlace, shutdown
+
+
+@pytest.fixture(autouse=True)
+def configured(stub_options):
+    configure(**stub_options)
+    yield
+    shutdown()
+
+
+# Function to make a person as the CSV import does
+def imported(name, viaf='', aliases=()):
+    return {'name': name, 'viaf': viaf, 'aliases': list(aliases)}
+
+
+@pytest.mark.parametrize('rule', list(normalizationRules))
+def test_each_rule_works_on_its_own(rule):
+    person = imported('Lady Mary Wortley Montagu', aliases=['Mary Pierrepont', 'Lady Mary Wortley Montagu'])
+    normalizeEntity(person['name'], person, [rule])
+    normalizeEntity('Nowhere', {'name': 'Nowhere'}, [rule])
+
+
+def test_rules_reproduce_the_cleanup_of_imported_people():
+    people = {
+        'Sir Hans Sloane': imported('Sir Hans Sloane', '27349086', ['Sloane, Hans', 'Sloane, Hans', 'Sir Hans Sloane']),
+        'Lady Anne Sloane': imported('Lady Anne Sloane', aliases=['Mr and Mrs Sloane']),
+        'Mrs Delany': imported('Mrs Delany', aliases=['Mary Granville']),
+        'Lord Byron': imported('Lord Byron'),
+    }
+    for key, person in people.items():
+        normalizeEntity(key, person, entity_matcher.PEOPLE_NORMALIZATION)
+
+    assert people['Sir Hans Sloane'] == {'name': 'Sir Hans Sloane', 'viaf': '27349086', 'aliases': ['Sloane, Hans'],
+                                         'iri': None, 'desc': None, 'image': None, 'gender': 'man', 'birth': None,
+                                         'death': None}
+    # Male honorifics win over female ones in a name, and the last name with an honorific wins
+    assert people['Lady Anne Sloane']['gender'] == 'man'
+    assert people['Mrs Delany']['gender'] == 'woman'
+    assert people['Lord Byron']['viaf'] is None
+
+
+def test_matched_people_born_too_late_are_unmatched_and_genders_mapped():
+    late = {'name': 'Joseph Banks', 'viaf': None, 'aliases': [], 'iri': 'http://www.wikidata.org/entity/Q5', 'desc': 'x',
+            'image': 'y', 'gender': 'male', 'birth': '1743-02-24', 'death': '1820-06-19'}
+    later = dict(late, name='Joseph Banks (botanist)', birth='1744-01-01', gender='female')
+    unmatched = dict(late, iri=None, gender='male')
+    normalizeEntity('Sir Joseph Banks', late, entity_matcher.PEOPLE_NORMALIZATION)
+    normalizeEntity('Sir Joseph Banks', later, entity_matcher.PEOPLE_NORMALIZATION)
+    normalizeEntity('Sir Joseph Banks', unmatched, entity_matcher.PEOPLE_NORMALIZATION)
+
+    assert (late['iri'], late['gender'], late['birth']) == ('http://www.wikidata.org/entity/Q5', 'man', '1743-02-24')
+    assert later == dict(late, name='Sir Joseph Banks', iri=None, desc=None, image=None, gender='woman', birth=None,
+                         death=None)
+    # Without an IRI the gender is cleared, and then guessed from the honorifics
+    assert unmatched['gender'] == 'man'
+
+
+def test_places_matched_to_banned_iris_are_kept_without_the_banned_rule(monkeypatch):
+    monkeypatch.setattr(entity_matcher, 'UPDATE_ALL', True)
+    place = {'name': 'Nowhere', 'viaf': None, 'aliases': [], 'iri': BANNED[0]}
+    normalizeEntity('Nowhere', place, ['aliases', 'viaf'])
+    assert processPlace('Nowhere', place, {}) == (False, 'matched')
+    assert place['iri'] == BANNED[0]
@@ -0,0 +1,26 @@
+import os
+
+from entity_matcher import ResponseCache
+
+
+# Function to get the total size of the responses in a cache database
+def stored(cache):
+    return cache.db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+
+def test_processes_sharing_a_cache_evict_by_its_total_size(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    first = ResponseCache(path, 0.01)
+    second = ResponseCache(path, 0.01)
+    for i in range(40):
+        for cache in (first, second):
+            cache.put(f'{id(cache)} {i}', 'search', os.urandom(300).hex())
+        assert stored(first) <= first.maxSize
+    assert first.db.execute('SELECT size FROM total').fetchone()[0] == stored(first)
+    first.close()
+    second.close()
+
+    # The total size is kept when the cache is opened again
+    third = ResponseCache(path, 0.01)
+    assert third.db.execute('SELECT size FROM total').fetchone()[0] == stored(third)
+    third.close()
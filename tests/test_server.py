@@ -0,0 +1,56 @@
+import http.client
+import http.server
+import json
+import threading
+
+import pytest
+
+from entity_matcher import MatchServer, configure, shutdown
+
+
+@pytest.fixture
+def server(stub_options):
+    configure(**stub_options)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), MatchServer)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True).start()
+    yield server.server_port
+    server.shutdown()
+    server.server_close()
+    shutdown()
+
+
+# Function to post a body to the server and return the status and the JSON response
+def post(port, path, body):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    connection.request('POST', path, body if isinstance(body, bytes) else json.dumps(body).encode('utf-8'))
+    response = connection.getresponse()
+    result = response.status, json.loads(response.read())
+    connection.close()
+    return result
+
+
+def test_single_lookup(server):
+    status, match = post(server, '/places', {'name': 'London', 'aliases': ['Londres'], 'lat': 51.5, 'lon': '-0.12'})
+    assert status == 200
+    assert match['name'] == 'London' and 'iri' in match
+
+
+def test_batch_lookup(server):
+    status, matches = post(server, '/people', ['James Petiver', {'name': 'Martin Lister', 'viaf': 7457153}])
+    assert status == 200
+    assert [x['name'] for x in matches] == ['James Petiver', 'Martin Lister']
+
+
+@pytest.mark.parametrize('body', [
+    b'not json', 5, {}, {'name': ' '}, {'name': 'London', 'aliases': [None]}, {'name': 'London', 'aliases': 'Londres'},
+    {'name': 'London', 'aliases': ['']}, {'name': 'London', 'viaf': {'id': 1}}, {'name': 'London', 'lat': [51.5]},
+    {'name': 'London', 'lon': True}, ['London', {'name': 'Paris', 'aliases': [7]}],
+])
+def test_malformed_lookups_are_rejected(server, body):
+    status, error = post(server, '/places', body)
+    assert status == 400 and error['error'].startswith('Invalid lookup')
+
+
+def test_unknown_path(server):
+    assert post(server, '/things', {'name': 'London'})[0] == 404